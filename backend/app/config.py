@@ -9,6 +9,43 @@ class Settings(BaseSettings):
     firebase_client_email: str
     firestore_collection: str = "events"
     openai_api_key: Optional[str] = None
+    google_application_credentials: Optional[str] = None
+    ffmpeg_path: str = "ffmpeg"
+    catalog_ttl_seconds: int = 60
+    catalog_full_reload_seconds: int = 3600
+    catalog_snapshot_path: str = "data/catalog"
+    search_index_path: str = "data/search"
+    coattendance_path: str = "data/coattendance"
+    coattendance_top_k: int = 50
+    coattendance_weight: float = 2.0
+    recommendation_cache_ttl_seconds: int = 30
+    recommendation_cache_max_entries: int = 10000
+    preference_cache_size: int = 10000
+    preference_cache_ttl_seconds: int = 300
+    warmup_preference_count: int = 1000
+    warmup_upstream_clients: bool = True
+    profile_token: Optional[str] = None
+    profile_sample_rate: float = 0.0
+    profile_slow_ms: float = 1000
+    profile_interval_ms: float = 5
+    profile_output_dir: str = "data/profiles"
+    profile_max_files: int = 200
+    speech_max_concurrency: int = 2
+    speech_max_queue: int = 4
+    vision_max_concurrency: int = 4
+    vision_max_queue: int = 8
+    bulk_max_concurrency: int = 2
+    bulk_max_queue: int = 4
+    admission_queue_timeout_seconds: float = 5
+    validate_responses: bool = False
+    live_poll_seconds: float = 1.0
+    live_min_interval_seconds: float = 1.0
+    live_max_connections: int = 10000
+    live_max_subscriptions: int = 200
+    reminder_lead_minutes: int = 60
+    reminder_batch_size: int = 500
+    reminder_poll_seconds: float = 30
+    reminder_sender: str = "app.services.reminders:LogSender"
     
     debug: bool = False
     host: str = "0.0.0.0"
@@ -0,0 +1,46 @@
+"""Build the item-to-item co-attendance matrix used by /recommendations.
+
+Full rebuild::
+
+    python -m app.jobs.build_coattendance
+
+Incremental run (only attendances newer than the previous run)::
+
+    python -m app.jobs.build_coattendance --incremental
+
+Deleted attendances are only dropped by a full rebuild, so schedule one
+periodically alongside the incremental runs.
+"""
+import argparse
+import os
+
+from app.config import settings
+from app.services.coattendance import CoAttendanceBuilder, load_state, save_state
+from app.services.firestore import get_firestore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=settings.coattendance_path)
+    parser.add_argument("--top-k", type=int, default=settings.coattendance_top_k)
+    parser.add_argument("--incremental", action="store_true")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    builder = load_state(args.output) if args.incremental else None
+    if builder is None:
+        builder = CoAttendanceBuilder()
+
+    added = 0
+    for attendance in get_firestore().stream_attendances(since=builder.last_timestamp):
+        builder.add(attendance["device_id"], attendance["event_id"], attendance.get("timestamp"))
+        added += 1
+
+    matrix = builder.build(args.top_k)
+    version_dir = matrix.save(args.output)
+    save_state(args.output, builder)
+    print(f"{added} attendances applied, {len(matrix.event_ids)} events, {len(matrix.indices)} neighbours -> {version_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Dump a collection as NDJSON, optionally gzipped and incremental.
+
+    python -m app.jobs.export events --gzip --output events.ndjson.gz
+    python -m app.jobs.export attendances --since 2026-10-18T00:00:00+00:00
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from app.services.export import SINCE_FIELDS, export_lines, gzip_stream
+from app.services.firestore import get_firestore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("collection", choices=sorted(SINCE_FIELDS))
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output", help="File to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    chunks = export_lines(get_firestore(), args.collection, args.since)
+    if args.gzip:
+        chunks = gzip_stream(chunks)
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Rekey preference documents by device id and drop duplicates.
+
+Older preferences were stored under random ``prf_`` ids, one per
+onboarding attempt. For every device this keeps the newest document,
+writes it to ``preferences/{device_id}`` and deletes the rest::
+
+    python -m app.jobs.migrate_preferences --dry-run
+    python -m app.jobs.migrate_preferences
+"""
+import argparse
+
+from app.services.firestore import BATCH_LIMIT, get_firestore
+
+
+def _newer(a, b) -> bool:
+    if a.get("timestamp") is None:
+        return False
+    return b.get("timestamp") is None or a["timestamp"] > b["timestamp"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    firestore_service = get_firestore()
+    db = firestore_service.db
+    collection = db.collection(firestore_service.preferences_collection)
+
+    # device_id -> (newest document data, ids of every document for the device)
+    by_device = {}
+    for doc in collection.stream():
+        data = doc.to_dict()
+        device_id = data.get("device_id")
+        if not device_id:
+            continue
+        newest, doc_ids = by_device.get(device_id, (None, []))
+        doc_ids.append(doc.id)
+        if newest is None or _newer(data, newest):
+            newest = data
+        by_device[device_id] = (newest, doc_ids)
+
+    batch = db.batch()
+    pending = rekeyed = deleted = 0
+    for device_id, (newest, doc_ids) in by_device.items():
+        if doc_ids == [device_id]:
+            continue
+        # The rekeyed write is queued before its deletes, so a partial run
+        # never removes a device's only copy
+        ops = [("set", collection.document(device_id), {**newest, "id": device_id})]
+        ops += [("delete", collection.document(doc_id), None) for doc_id in doc_ids if doc_id != device_id]
+        rekeyed += 1
+        deleted += len(ops) - 1
+        for kind, ref, data in ops:
+            if pending == BATCH_LIMIT:
+                if not args.dry_run:
+                    batch.commit()
+                batch = db.batch()
+                pending = 0
+            if kind == "set":
+                batch.set(ref, data)
+            else:
+                batch.delete(ref)
+            pending += 1
+    if pending and not args.dry_run:
+        batch.commit()
+
+    prefix = "[dry run] " if args.dry_run else ""
+    print(f"{prefix}{len(by_device)} devices, {rekeyed} rekeyed, {deleted} documents removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Send event reminders to attendees ahead of each event's start.
+
+    python -m app.jobs.reminders
+    python -m app.jobs.reminders --once --sender mypackage.push:PushSender
+
+Runs until stopped: rebuilds the reminder timers from Firestore, follows
+event changes every ``REMINDER_POLL_SECONDS`` and sends reminders as they
+come due through ``REMINDER_SENDER``. Run a single instance; each one
+sends every reminder. ``--once`` sends what is due now and exits.
+"""
+from datetime import timedelta
+import argparse
+import time
+
+from app.config import settings
+from app.services.reminders import ReminderScheduler, load_sender
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sender", default=settings.reminder_sender)
+    parser.add_argument("--lead-minutes", type=int, default=settings.reminder_lead_minutes)
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args(argv)
+
+    scheduler = ReminderScheduler(
+        load_sender(args.sender), timedelta(minutes=args.lead_minutes), settings.reminder_batch_size
+    )
+    print(f"{scheduler.rebuild()} upcoming events with reminders")
+    if args.once:
+        print(f"{scheduler.dispatch()} reminders sent")
+        return
+
+    polled_at = time.monotonic()
+    while True:
+        time.sleep(scheduler.tick_seconds)
+        if time.monotonic() - polled_at >= settings.reminder_poll_seconds:
+            scheduler.poll_changes()
+            polled_at = time.monotonic()
+        sent = scheduler.dispatch()
+        if sent:
+            print(f"{sent} reminders sent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Write a columnar snapshot of the active events for the API workers.
+
+    python -m app.jobs.snapshot_catalog
+
+Workers memory-map the newest snapshot at startup and on each new
+version, then apply changes made after the snapshot time from Firestore,
+so running this periodically keeps those deltas small. The full-text
+search postings for the snapshot are published first, so a worker that
+picks up the new snapshot finds them ready.
+
+Once the snapshot is published, the attendance deletion log is pruned of
+entries older than ``CATALOG_FULL_RELOAD_SECONDS`` before the snapshot's
+counts. Workers on the new snapshot only read the log after it, and that
+margin covers workers still on an in-memory catalog or switching over
+from the previous snapshot.
+"""
+from datetime import timedelta
+import argparse
+import os
+
+from app.config import settings
+from app.services.firestore import get_firestore
+from app.services.search import SearchIndex
+from app.services.snapshot import CatalogSnapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=settings.catalog_snapshot_path)
+    parser.add_argument("--search-output", default=settings.search_index_path)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    os.makedirs(args.search_output, exist_ok=True)
+    snapshot = CatalogSnapshot.from_firestore(get_firestore())
+    index = SearchIndex.build(snapshot)
+    index_dir = index.save(args.search_output)
+    version_dir = snapshot.save(args.output)
+    print(f"{len(snapshot)} events, {int(snapshot.arrays.count.sum())} attendances as of {snapshot.snapshot_time.isoformat()} -> {version_dir}")
+    print(f"{len(index.terms)} search terms, {len(index.rows)} postings -> {index_dir}")
+    cutoff = snapshot.counted_through - timedelta(seconds=settings.catalog_full_reload_seconds)
+    pruned = get_firestore().prune_attendance_deletions(cutoff)
+    print(f"{pruned} attendance deletions logged before {cutoff.isoformat()} pruned")
+
+
+if __name__ == "__main__":
+    main()
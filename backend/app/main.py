@@ -3,64 +3,52 @@
 from datetime import datetime
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.config import settings
-from app.routes import events, attendances
+from app.routes import events, attendances, event_import, preferences
 from app.routes import recommendations
 from app.routes import aihelper
-from app.models.preference import PreferenceCreate, Preference
+from app.routes import export
+from app.services.admission import AdmissionMiddleware
 from app.services.firestore import get_firestore
+from app.services.live import get_live_hub
+from app.services.metrics import MetricsMiddleware, observe_backend, render_metrics
+from app.services.profiling import ProfiledRoute, ProfilingMiddleware
+from app.services.readiness import get_readiness
 
-import firebase_admin
-from firebase_admin import credentials, firestore
+from contextlib import asynccontextmanager
 from logging import getLogger
-
-from google.cloud import speech
+import asyncio
 import base64
 import os
+import subprocess
+import tempfile
 
-FFMPEG_PATH = r"C:\ffmpeg\bin\ffmpeg.exe"
+from app.services.speech import transcribe_flac
 
 logger = getLogger("uvicorn")
 
-# ---------- Firebase / Firestore setup using settings ----------
-
-FIREBASE_PROJECT_ID = settings.firebase_project_id
-FIREBASE_CLIENT_EMAIL = settings.firebase_client_email
-FIREBASE_PRIVATE_KEY = settings.firebase_private_key
-
-# Private key from .env has literal '\n' – convert to actual newlines
-FIREBASE_PRIVATE_KEY = FIREBASE_PRIVATE_KEY.replace("\\n", "\n")
-
-cred_info = {
-    "type": "service_account",
-    "project_id": FIREBASE_PROJECT_ID,
-    "private_key": FIREBASE_PRIVATE_KEY,
-    "client_email": FIREBASE_CLIENT_EMAIL,
-    "token_uri": "https://oauth2.googleapis.com/token",
-    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-    "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-}
-
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(credentials.Certificate(cred_info))
-
-db = firestore.client()
 
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"C:\Users\Alex\Junction-2025\backend\google-credentials.json"
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The one place Firebase is initialised; heavier SDKs (speech, openai)
+    # are imported by the routes that need them on first use or by warm-up
+    get_firestore()
+    get_readiness().start()
+    # The process's one change listener for /events/live
+    live_listener = asyncio.create_task(get_live_hub().run())
+    yield
+    live_listener.cancel()
 
-try:
-    client = speech.SpeechClient()
-    logger.info("✅ Google Speech client initialized successfully")
-except Exception as e:
-    logger.error(f"❌ Failed to initialize Google Speech client: {e}")
-# ------------------------------------------------------------------
 
 app = FastAPI(
     title="Events Backend API",
     version="1.0.0",
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -69,14 +57,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+# Innermost of the three, so shed requests still show up in metrics
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Routes declared on the app itself get the same endpoint markers as the routers
+app.router.route_class = ProfiledRoute
 
 # Include other routers
+app.include_router(event_import.router)
 app.include_router(events.router)
 app.include_router(attendances.router)
+app.include_router(preferences.router)
 app.include_router(recommendations.router)
 app.include_router(aihelper.router)
-# ❌ do NOT include preferences.router; we're defining /preferences right here
+app.include_router(export.router)
 
 
 @app.get("/")
@@ -89,32 +86,19 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.post("/preferences", response_model=Preference)
-async def create_preference(pref: PreferenceCreate):
-    logger.info("/preferences payload: %s", pref.dict())
-    firestore = get_firestore()
-
-    preference_data = {
-        "device_id": pref.device_id,
-        "name": pref.name,
-        "age": pref.age,
-        "location": pref.location,
-        "activities": pref.activities,
-        "topics": pref.topics,
-        "chat_times": pref.chat_times,
-        "activity_type": pref.activity_type,
-        "looking_for": pref.looking_for,
-    }
-
-    pref_id = firestore.create_preference(preference_data)
-    created = firestore.get_preference(pref_id)
-    return Preference(**created)
-
-from google.cloud import speech
-import base64
-import os
-import tempfile
-import subprocess
+@app.get("/ready")
+async def readiness_check():
+    readiness = get_readiness()
+    if not readiness.ready:
+        # Retries a failed warm-up; no-op while one is still running
+        readiness.start()
+    return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 
 @app.post("/speech-to-text")
 async def speech_to_text(audio_data: dict):
@@ -126,7 +110,6 @@ async def speech_to_text(audio_data: dict):
     """
     try:
         logger.info("🎯 Request reached /speech-to-text endpoint!")
-        client = speech.SpeechClient()
 
         # 1) Decode base64 to raw bytes
         raw_bytes = base64.b64decode(audio_data["audio"])
@@ -145,12 +128,14 @@ async def speech_to_text(audio_data: dict):
         logger.info(f"🎯 Converting with ffmpeg: {input_path} -> {output_path}")
 
         # ffmpeg -i input -ac 1 -ar 16000 output.flac
-        subprocess.run(
-        [FFMPEG_PATH, "-y", "-i", input_path, "-ac", "1", "-ar", "16000", output_path],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        check=True,
-    )
+        with observe_backend("ffmpeg", "transcode"):
+            await run_in_threadpool(
+                subprocess.run,
+                [settings.ffmpeg_path, "-y", "-i", input_path, "-ac", "1", "-ar", "16000", output_path],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                check=True,
+            )
 
         with open(output_path, "rb") as f:
             flac_bytes = f.read()
@@ -161,22 +146,7 @@ async def speech_to_text(audio_data: dict):
 
         logger.info(f"🎯 FLAC bytes size: {len(flac_bytes)}")
 
-        audio = speech.RecognitionAudio(content=flac_bytes)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.FLAC,
-            sample_rate_hertz=16000,
-            language_code="en-US",
-            enable_automatic_punctuation=True,
-        )
-
-        response = client.recognize(config=config, audio=audio)
-
-        transcripts = [
-            result.alternatives[0].transcript
-            for result in response.results
-            if result.alternatives
-        ]
-        final_text = " ".join(transcripts).strip()
+        final_text = await run_in_threadpool(transcribe_flac, flac_bytes)
 
         if not final_text:
             logger.warning("❌ No text recognized")
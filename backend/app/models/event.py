@@ -37,3 +37,4 @@ class Event(BaseModel):
     amenities: list[str]
     active: bool
     timestamp: datetime
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Literal
+
+
+class LiveRequest(BaseModel):
+    action: Literal["subscribe", "unsubscribe"]
+    event_ids: list[str] = []
+    categories: list[str] = []
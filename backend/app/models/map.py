@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Optional, Dict
+from datetime import datetime
+
+
+class MapCluster(BaseModel):
+    lat: float
+    lng: float
+    count: int
+    categories: Dict[str, int]
+    bounds: list[float]
+
+
+class MapEvent(BaseModel):
+    id: str
+    name: Optional[str] = None
+    category: Optional[str] = None
+    lat: float
+    lng: float
+    start_date: Optional[datetime] = None
+
+
+class MapView(BaseModel):
+    level: int
+    clusters: list[MapCluster]
+    events: list[MapEvent]
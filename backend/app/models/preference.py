@@ -37,3 +37,4 @@ class Preference(BaseModel):
     activity_type: str
     looking_for: List[str]
     timestamp: datetime
+    updated_at: Optional[datetime] = None
@@ -1,11 +1,16 @@
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, status, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from app.config import settings
+from app.services.metrics import observe_backend
+from app.services.openai_client import get_openai
+from app.services.profiling import ProfiledRoute
 import base64
+import json
 from pydantic import BaseModel
 
 
-router = APIRouter(prefix="/aihelper", tags=["aihelper"])
+router = APIRouter(prefix="/aihelper", tags=["aihelper"], route_class=ProfiledRoute)
 
 
 class ScamDetectionResponse(BaseModel):
@@ -29,10 +34,7 @@ async def detect_scam_image(
     if not settings.openai_api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
     try:
-        from openai import OpenAI
-        import json
-        
-        client = OpenAI(api_key=settings.openai_api_key)
+        client = get_openai()
         
         content = await image.read()
         if not content:
@@ -60,7 +62,8 @@ async def detect_scam_image(
             },
         ]
         
-        resp = client.chat.completions.create(model=model, messages=messages)
+        with observe_backend("openai", "chat.completions.create"):
+            resp = await run_in_threadpool(client.chat.completions.create, model=model, messages=messages)
         
         if not resp.choices or not resp.choices[0].message.content:
             return ScamDetectionResponse(
@@ -119,10 +122,7 @@ async def medication_instructions(
     if not settings.openai_api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
     try:
-        from openai import OpenAI
-        import json
-        
-        client = OpenAI(api_key=settings.openai_api_key)
+        client = get_openai()
         
         content = await image.read()
         if not content:
@@ -152,7 +152,8 @@ async def medication_instructions(
             },
         ]
         
-        resp = client.chat.completions.create(model=model, messages=messages)
+        with observe_backend("openai", "chat.completions.create"):
+            resp = await run_in_threadpool(client.chat.completions.create, model=model, messages=messages)
         
         if not resp.choices or not resp.choices[0].message.content:
             return MedicationInstructionsResponse(
@@ -1,8 +1,13 @@
 from fastapi import APIRouter, HTTPException, status
+from google.api_core.exceptions import AlreadyExists
 from app.models.attendance import AttendanceCreate, Attendance
+from app.services.catalog import get_catalog
 from app.services.firestore import get_firestore
+from app.services.profiling import ProfiledRoute
+from app.services.recommendation_cache import get_recommendation_cache
+from app.services.serialization import render
 
-router = APIRouter(prefix="/events", tags=["attendances"])
+router = APIRouter(prefix="/events", tags=["attendances"], route_class=ProfiledRoute)
 
 
 @router.post("/{event_id}/attendances", response_model=Attendance, status_code=status.HTTP_201_CREATED)
@@ -10,21 +15,22 @@ async def create_attendance(event_id: str, attendance: AttendanceCreate):
     try:
         firestore_service = get_firestore()
         
-        event = firestore_service.get_event(event_id)
+        # The catalog only holds active events; fall back for anything else
+        event = get_catalog().peek(event_id) or firestore_service.get_event(event_id)
         if not event:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Event with ID {event_id} not found"
             )
         
-        if firestore_service.check_device_attendance(event_id, attendance.device_id):
+        attendee_devices = firestore_service.list_attendee_devices(event_id)
+        if attendance.device_id in attendee_devices:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Device already registered for this event"
             )
         
-        current_count = firestore_service.count_attendances_for_event(event_id)
-        if current_count >= event["max_attendance"]:
+        if len(attendee_devices) >= event["max_attendance"]:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Event has reached maximum attendance capacity"
@@ -35,10 +41,18 @@ async def create_attendance(event_id: str, attendance: AttendanceCreate):
             "device_id": attendance.device_id
         }
         
-        attendance_id = firestore_service.create_attendance(attendance_data)
-        created_attendance = firestore_service.get_attendance(attendance_id)
+        try:
+            created_attendance = firestore_service.create_attendance(attendance_data)
+        except AlreadyExists:
+            # Lost a race with a concurrent registration from the same device
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Device already registered for this event"
+            )
+        get_catalog().adjust_count(event_id, 1)
+        get_recommendation_cache().invalidate_device(attendance.device_id)
         
-        return Attendance(**created_attendance)
+        return render(Attendance, created_attendance, status_code=status.HTTP_201_CREATED)
     
     except HTTPException:
         raise
@@ -74,7 +88,7 @@ async def get_attendance(event_id: str, attendance_id: str):
                 detail="Attendance does not belong to this event"
             )
         
-        return Attendance(**attendance)
+        return render(Attendance, attendance)
     
     except HTTPException:
         raise
@@ -90,13 +104,8 @@ async def delete_attendance(event_id: str, attendance_id: str):
     try:
         firestore_service = get_firestore()
         
-        event = firestore_service.get_event(event_id)
-        if not event:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Event with ID {event_id} not found"
-            )
-        
+        # The attendance read also proves the event exists (events are only
+        # soft-deleted), so no separate event lookup
         attendance = firestore_service.get_attendance(attendance_id)
         if not attendance:
             raise HTTPException(
@@ -110,7 +119,9 @@ async def delete_attendance(event_id: str, attendance_id: str):
                 detail="Attendance does not belong to this event"
             )
         
-        firestore_service.delete_attendance(attendance_id)
+        firestore_service.delete_attendance(attendance)
+        get_catalog().adjust_count(event_id, -1)
+        get_recommendation_cache().invalidate_device(attendance["device_id"])
         return None
     
     except HTTPException:
@@ -0,0 +1,120 @@
+import asyncio
+import random
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from google.api_core.exceptions import (
+    Aborted,
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
+from pydantic import ValidationError
+
+from app.models.event import EventCreate
+from app.services.catalog import get_catalog
+from app.services.firestore import BATCH_LIMIT, get_firestore
+from app.services.ndjson import StreamFormatError, iter_json_array, iter_ndjson
+from app.services.profiling import ProfiledRoute
+from app.services.recommendation_cache import get_recommendation_cache
+
+router = APIRouter(prefix="/events", tags=["events"], route_class=ProfiledRoute)
+
+# Batched commits allowed in flight while the body is still being parsed
+MAX_IN_FLIGHT = 4
+MAX_ATTEMPTS = 5
+RETRYABLE = (Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable)
+
+
+async def _commit_with_backoff(firestore_service, chunk: list[dict]) -> list[dict]:
+    # Built once so every attempt writes the same ids: a retry after a
+    # commit whose response was lost finds them instead of duplicating them
+    events = [firestore_service.new_event_doc(event_data) for event_data in chunk]
+    delay = 0.25
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return await run_in_threadpool(firestore_service.commit_new_events, events, attempt > 0)
+        except RETRYABLE:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+
+
+async def _write_chunk(firestore_service, chunk: list[dict], rows: list[int], results: list) -> None:
+    try:
+        created = await _commit_with_backoff(firestore_service, chunk)
+    except Exception as e:
+        for row in rows:
+            results[row] = {"row": row, "status": "error", "error": f"Write failed: {str(e)}"}
+        return
+    catalog = get_catalog()
+    for row, event in zip(rows, created):
+        catalog.upsert(event)
+        results[row] = {"row": row, "status": "created", "id": event["id"]}
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'body'}: {err['msg']}" for err in e.errors())
+
+
+@router.post("/import")
+async def import_events(request: Request):
+    """Bulk-create events from a JSON array or NDJSON body.
+
+    The body is parsed as it streams in; valid rows are written in
+    batches of up to 500 with a few commits in flight and retried with
+    back-off on transient errors. Returns one result per input row.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        values = iter_ndjson(request.stream())
+    else:
+        values = iter_json_array(request.stream())
+
+    firestore_service = get_firestore()
+    results: list = []
+    chunk: list[dict] = []
+    chunk_rows: list[int] = []
+    in_flight: set = set()
+
+    async def flush():
+        nonlocal chunk, chunk_rows
+        if len(in_flight) >= MAX_IN_FLIGHT:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.difference_update(done)
+        in_flight.add(asyncio.ensure_future(_write_chunk(firestore_service, chunk, chunk_rows, results)))
+        chunk, chunk_rows = [], []
+
+    try:
+        async for value in values:
+            row = len(results)
+            results.append(None)
+            if isinstance(value, StreamFormatError):
+                results[row] = {"row": row, "status": "error", "error": str(value)}
+                continue
+            try:
+                event = EventCreate.model_validate(value)
+            except ValidationError as e:
+                results[row] = {"row": row, "status": "error", "error": _validation_message(e)}
+                continue
+            chunk.append(event.model_dump())
+            chunk_rows.append(row)
+            if len(chunk) == BATCH_LIMIT:
+                await flush()
+    except StreamFormatError as e:
+        if not results:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        # Rows before the malformed point are still imported
+        results.append({"row": len(results), "status": "error", "error": str(e)})
+
+    if chunk:
+        await flush()
+    if in_flight:
+        await asyncio.wait(in_flight)
+
+    created = sum(1 for r in results if r["status"] == "created")
+    if created:
+        get_recommendation_cache().invalidate_all()
+    return {"created": created, "failed": len(results) - created, "results": results}
@@ -1,8 +1,76 @@
-from fastapi import APIRouter, HTTPException, status
+from logging import getLogger
+from typing import Optional
+import asyncio
+
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from fastapi.websockets import WebSocketState
+from google.api_core.exceptions import FailedPrecondition, NotFound
+from pydantic import ValidationError
 from app.models.event import EventCreate, EventUpdate, Event
+from app.models.live import LiveRequest
+from app.models.map import MapView
+from app.services.catalog import get_catalog
+from app.services.conditional import EVENT_CACHE_CONTROL, etag_for, is_current, not_modified, precondition, validators
 from app.services.firestore import get_firestore
+from app.services.live import Subscription, get_live_hub
+from app.services.profiling import ProfiledRoute, span
+from app.services.recommendation_cache import get_recommendation_cache
+from app.services.serialization import FastJSONResponse, dumps, render
+
+logger = getLogger("uvicorn")
+
+router = APIRouter(prefix="/events", tags=["events"], route_class=ProfiledRoute)
+
+# Fields that feed filtering or scoring in /recommendations
+RANKING_FIELDS = {"category", "coordinates", "start_date", "end_date", "max_attendance", "amenities"}
+
+# Projection used by list views when the client does not ask for fields
+LIST_FIELDS = ["name", "category", "coordinates", "start_date", "end_date"]
+
+# Retry-After hint while the search index is being built
+SEARCH_RETRY_AFTER_SECONDS = 5
+
+
+def _stream_page(firestore_service, limit: int, start_after: Optional[str], fields: list[str]):
+    # Emit {"items": [...], "next_cursor": ...} one document at a time
+    yield b'{"items":['
+    last_id = None
+    count = 0
+    for event in firestore_service.stream_events_page(limit, start_after, fields):
+        if count:
+            yield b","
+        yield dumps(event)
+        last_id = event["id"]
+        count += 1
+    next_cursor = last_id if count == limit else None
+    yield b'],"next_cursor":' + dumps(next_cursor) + b"}"
+
 
-router = APIRouter(prefix="/events", tags=["events"])
+@router.get("")
+async def list_events(
+    limit: int = Query(50, gt=0, le=500),
+    start_after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated Event fields to return"),
+):
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = set(selected) - set(Event.model_fields)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+            )
+    else:
+        selected = LIST_FIELDS
+    # The document id doubles as "id"; never ask Firestore to project it
+    selected = [f for f in selected if f != "id"]
+
+    firestore_service = get_firestore()
+    return StreamingResponse(
+        _stream_page(firestore_service, limit, start_after, selected),
+        media_type="application/json",
+    )
 
 
 @router.post("/register", response_model=Event, status_code=status.HTTP_201_CREATED)
@@ -21,10 +89,12 @@ async def register_event(event: EventCreate):
             "amenities": event.amenities
         }
         
-        event_id = firestore_service.create_event(event_data)
-        created_event = firestore_service.get_event(event_id)
+        created_event = firestore_service.create_event(event_data)
+        get_catalog().upsert(created_event)
+        # A new event can outrank anything in the cached lists
+        get_recommendation_cache().invalidate_all()
         
-        return Event(**created_event)
+        return render(Event, created_event, status_code=status.HTTP_201_CREATED)
     
     except Exception as e:
         raise HTTPException(
@@ -33,9 +103,141 @@ async def register_event(event: EventCreate):
         )
 
 
+@router.get("/search", response_model=list[Event])
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in names and descriptions"),
+    limit: int = Query(20, gt=0, le=100),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=200),
+):
+    if radius_km is not None and (lat is None or lng is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="radius_km needs lat and lng"
+        )
+    try:
+        catalog = get_catalog()
+        origin = (lat, lng) if radius_km is not None else None
+        with span("search"):
+            event_ids = catalog.search(q, limit, origin=origin, radius_km=radius_km)
+        if event_ids is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Search index is being built, try again shortly",
+                headers={"Retry-After": str(SEARCH_RETRY_AFTER_SECONDS)},
+            )
+        return render(Event, [catalog.peek(event_id) for event_id in event_ids])
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search events: {str(e)}"
+        )
+
+
+@router.get("/map", response_model=MapView)
+async def map_events(
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+):
+    if south > north or west > east:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bounding box needs south <= north and west <= east"
+        )
+    try:
+        with span("map"):
+            view = get_catalog().map_view(south, west, north, east, zoom)
+        return FastJSONResponse(view)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to load map view: {str(e)}"
+        )
+
+
+async def _send_deltas(websocket: WebSocket, subscription: Subscription):
+    try:
+        while True:
+            deltas = await subscription.next_batch()
+            await websocket.send_bytes(dumps({"type": "deltas", "deltas": deltas}))
+    except WebSocketDisconnect:
+        # The receive loop sees the disconnect too
+        pass
+    except Exception:
+        logger.exception("Live update push failed")
+        try:
+            # 1011: internal error
+            await websocket.close(code=1011)
+        except (RuntimeError, WebSocketDisconnect):
+            pass
+
+
+async def _apply_requests(websocket: WebSocket, subscription: Subscription) -> Optional[int]:
+    # Returns None once the client disconnects, or the code to close with
+    hub = get_live_hub()
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return None
+        if message.get("text") is None:
+            # 1003: unsupported data (requests are text frames)
+            return 1003
+        try:
+            request = LiveRequest.model_validate_json(message["text"])
+            if request.action == "subscribe":
+                hub.subscribe(subscription, request.event_ids, request.categories)
+            else:
+                hub.unsubscribe(subscription, request.event_ids, request.categories)
+        except (ValidationError, ValueError) as e:
+            await websocket.send_bytes(dumps({"type": "error", "detail": str(e)}))
+
+
+@router.websocket("/live")
+async def live_updates(websocket: WebSocket):
+    """Push seat counts, updates and cancellations of subscribed events.
+
+    Clients send ``{"action": "subscribe" | "unsubscribe", "event_ids":
+    [...], "categories": [...]}`` as text frames and receive ``{"type":
+    "deltas", "deltas": [...]}`` messages, one entry per changed event.
+    """
+    hub = get_live_hub()
+    subscription = hub.connect()
+    if subscription is None:
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    sender = asyncio.create_task(_send_deltas(websocket, subscription))
+    try:
+        code = await _apply_requests(websocket, subscription)
+        if code is not None and websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.close(code=code)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.disconnect(subscription)
+
+
 @router.get("/{event_id}", response_model=Event)
-async def get_event(event_id: str):
+async def get_event(event_id: str, if_none_match: Optional[str] = Header(None)):
     try:
+        if if_none_match:
+            # Revalidate against the catalog's copy without a Firestore read
+            etag = etag_for(get_catalog().get(event_id))
+            if is_current(if_none_match, etag):
+                return not_modified(etag, EVENT_CACHE_CONTROL)
+        
         firestore_service = get_firestore()
         event = firestore_service.get_event(event_id)
         
@@ -45,7 +247,10 @@ async def get_event(event_id: str):
                 detail=f"Event with ID {event_id} not found"
             )
         
-        return Event(**event)
+        etag = etag_for(event)
+        if is_current(if_none_match, etag):
+            return not_modified(etag, EVENT_CACHE_CONTROL)
+        return render(Event, event, headers=validators(etag, EVENT_CACHE_CONTROL))
     
     except HTTPException:
         raise
@@ -57,16 +262,10 @@ async def get_event(event_id: str):
 
 
 @router.put("/{event_id}", response_model=Event)
-async def update_event(event_id: str, event_update: EventUpdate):
+async def update_event(event_id: str, event_update: EventUpdate, if_match: Optional[str] = Header(None)):
     try:
+        expected_update_time = precondition(if_match)
         firestore_service = get_firestore()
-        event = firestore_service.get_event(event_id)
-        
-        if not event:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Event with ID {event_id} not found"
-            )
         
         # Build update data from non-None fields
         update_data = {k: v for k, v in event_update.model_dump().items() if v is not None}
@@ -77,11 +276,26 @@ async def update_event(event_id: str, event_update: EventUpdate):
                 detail="No fields to update"
             )
         
-        firestore_service.update_event(event_id, update_data)
-        updated_event = firestore_service.get_event(event_id)
+        catalog = get_catalog()
+        updated_event = firestore_service.update_event(
+            event_id, update_data, base=catalog.peek(event_id), expected_update_time=expected_update_time
+        )
+        catalog.upsert(updated_event)
+        if RANKING_FIELDS.intersection(update_data):
+            get_recommendation_cache().invalidate_all()
         
-        return Event(**updated_event)
+        return render(Event, updated_event, headers=validators(etag_for(updated_event), EVENT_CACHE_CONTROL))
     
+    except NotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with ID {event_id} not found"
+        )
+    except FailedPrecondition:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Event with ID {event_id} has changed since it was read"
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -95,17 +309,16 @@ async def update_event(event_id: str, event_update: EventUpdate):
 async def delete_event(event_id: str):
     try:
         firestore_service = get_firestore()
-        event = firestore_service.get_event(event_id)
-        
-        if not event:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Event with ID {event_id} not found"
-            )
-        
-        firestore_service.update_event(event_id, {"active": False})
+        firestore_service.deactivate_event(event_id)
+        get_catalog().remove(event_id)
+        get_recommendation_cache().invalidate_all()
         return None
     
+    except NotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with ID {event_id} not found"
+        )
     except HTTPException:
         raise
     except Exception as e:
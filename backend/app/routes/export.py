@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.export import export_lines, gzip_stream
+from app.services.firestore import get_firestore
+from app.services.profiling import ProfiledRoute
+
+router = APIRouter(prefix="/export", tags=["export"], route_class=ProfiledRoute)
+
+
+@router.get("/{collection}")
+async def export_collection(
+    collection: Literal["events", "attendances", "preferences"],
+    since: Optional[datetime] = Query(None, description="Only documents written after this time"),
+    gzip: bool = Query(False),
+):
+    lines = export_lines(get_firestore(), collection, since)
+    filename = f"{collection}.ndjson"
+    if gzip:
+        return StreamingResponse(
+            gzip_stream(lines),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'},
+        )
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
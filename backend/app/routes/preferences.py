@@ -1,11 +1,26 @@
-from fastapi import APIRouter, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from google.api_core.exceptions import FailedPrecondition, NotFound
 from app.models.preference import PreferenceCreate, PreferenceUpdate, Preference
+from app.services.conditional import (
+    PREFERENCE_CACHE_CONTROL,
+    etag_for,
+    is_current,
+    not_modified,
+    precondition,
+    validators,
+)
 from app.services.firestore import get_firestore
+from app.services.profiling import ProfiledRoute
+from app.services.recommendation_cache import get_recommendation_cache
+from app.services.serialization import render
 
-router = APIRouter(prefix="/preferences", tags=["preferences"])
+router = APIRouter(prefix="/preferences", tags=["preferences"], route_class=ProfiledRoute)
 
 
-@router.post("/", response_model=Preference, status_code=status.HTTP_201_CREATED)
+# Served at /preferences itself with a 200, the contract clients already use
+@router.post("", response_model=Preference)
 async def create_preference(preference: PreferenceCreate):
     try:
         firestore_service = get_firestore()
@@ -22,10 +37,10 @@ async def create_preference(preference: PreferenceCreate):
             "looking_for": preference.looking_for
         }
         
-        preference_id = firestore_service.create_preference(preference_data)
-        created_preference = firestore_service.get_preference(preference_id)
+        created_preference = firestore_service.upsert_preference(preference_data)
+        get_recommendation_cache().invalidate_device(preference.device_id)
         
-        return Preference(**created_preference)
+        return render(Preference, created_preference)
     
     except Exception as e:
         raise HTTPException(
@@ -35,9 +50,15 @@ async def create_preference(preference: PreferenceCreate):
 
 
 @router.get("/{preference_id}", response_model=Preference)
-async def get_preference(preference_id: str):
+async def get_preference(preference_id: str, if_none_match: Optional[str] = Header(None)):
     try:
         firestore_service = get_firestore()
+        if if_none_match:
+            # Revalidate against the cached copy without a Firestore read
+            etag = etag_for(firestore_service.peek_preference(preference_id))
+            if is_current(if_none_match, etag):
+                return not_modified(etag, PREFERENCE_CACHE_CONTROL)
+        
         preference = firestore_service.get_preference(preference_id)
         
         if not preference:
@@ -46,7 +67,10 @@ async def get_preference(preference_id: str):
                 detail=f"Preference with ID {preference_id} not found"
             )
         
-        return Preference(**preference)
+        etag = etag_for(preference)
+        if is_current(if_none_match, etag):
+            return not_modified(etag, PREFERENCE_CACHE_CONTROL)
+        return render(Preference, preference, headers=validators(etag, PREFERENCE_CACHE_CONTROL))
     
     except HTTPException:
         raise
@@ -58,16 +82,14 @@ async def get_preference(preference_id: str):
 
 
 @router.put("/{preference_id}", response_model=Preference)
-async def update_preference(preference_id: str, preference_update: PreferenceUpdate):
+async def update_preference(
+    preference_id: str,
+    preference_update: PreferenceUpdate,
+    if_match: Optional[str] = Header(None),
+):
     try:
+        expected_update_time = precondition(if_match)
         firestore_service = get_firestore()
-        preference = firestore_service.get_preference(preference_id)
-        
-        if not preference:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Preference with ID {preference_id} not found"
-            )
         
         update_data = {k: v for k, v in preference_update.model_dump().items() if v is not None}
         
@@ -77,11 +99,22 @@ async def update_preference(preference_id: str, preference_update: PreferenceUpd
                 detail="No fields to update"
             )
         
-        firestore_service.update_preference(preference_id, update_data)
-        updated_preference = firestore_service.get_preference(preference_id)
+        updated_preference = firestore_service.update_preference(preference_id, update_data, expected_update_time)
+        get_recommendation_cache().invalidate_device(updated_preference["device_id"])
         
-        return Preference(**updated_preference)
+        headers = validators(etag_for(updated_preference), PREFERENCE_CACHE_CONTROL)
+        return render(Preference, updated_preference, headers=headers)
     
+    except NotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Preference with ID {preference_id} not found"
+        )
+    except FailedPrecondition:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Preference with ID {preference_id} has changed since it was read"
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -95,17 +128,16 @@ async def update_preference(preference_id: str, preference_update: PreferenceUpd
 async def delete_preference(preference_id: str):
     try:
         firestore_service = get_firestore()
-        preference = firestore_service.get_preference(preference_id)
-        
-        if not preference:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Preference with ID {preference_id} not found"
-            )
-        
         firestore_service.delete_preference(preference_id)
+        # Preferences are keyed by device id
+        get_recommendation_cache().invalidate_device(preference_id)
         return None
     
+    except NotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Preference with ID {preference_id} not found"
+        )
     except HTTPException:
         raise
     except Exception as e:
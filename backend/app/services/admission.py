@@ -0,0 +1,165 @@
+from collections import deque
+from typing import Optional
+import asyncio
+import math
+import time
+
+from starlette.responses import JSONResponse
+
+from app.config import settings
+from app.services.metrics import admission_in_use, admission_queue_wait, admission_queued, admission_shed
+
+# Smoothing factor of the moving average service time behind Retry-After
+SERVICE_TIME_ALPHA = 0.2
+
+# Bounds of the Retry-After hint in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """At most ``limit`` concurrent requests, at most ``max_queue`` waiting.
+
+    A request arriving at a full queue is rejected with 429 right away; one
+    that waits longer than ``queue_timeout`` seconds gets 503. Slots are
+    handed over to waiters in arrival order.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque = deque()
+        self._service_time: Optional[float] = None
+
+    def retry_after(self) -> int:
+        if self._service_time is None:
+            return MIN_RETRY_AFTER
+        # Time for the slots to work through everyone already queued
+        estimate = self._service_time * (len(self._waiters) + 1) / self.limit
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def _update_gauges(self) -> None:
+        admission_in_use.set(self.active, self.name)
+        admission_queued.set(len(self._waiters), self.name)
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._update_gauges()
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Rejected(429, "queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the timeout fired
+                return
+            self._discard(waiter)
+            raise Rejected(503, "queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += SERVICE_TIME_ALPHA * (service_time - self._service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight over; ``active`` stays the same
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+
+def _build_pools() -> list[tuple[str, AdmissionPool]]:
+    timeout = settings.admission_queue_timeout_seconds
+    speech = AdmissionPool("speech", settings.speech_max_concurrency, settings.speech_max_queue, timeout)
+    vision = AdmissionPool("vision", settings.vision_max_concurrency, settings.vision_max_queue, timeout)
+    bulk = AdmissionPool("bulk", settings.bulk_max_concurrency, settings.bulk_max_queue, timeout)
+    # (path prefix, pool); everything else is unpooled and keeps the rest
+    # of the worker's capacity
+    return [
+        ("/speech-to-text", speech),
+        ("/aihelper/", vision),
+        ("/events/import", bulk),
+        ("/export/", bulk),
+    ]
+
+
+class AdmissionMiddleware:
+    """Route expensive endpoints through bounded per-class pools.
+
+    Speech-to-text, the AI vision helpers and bulk import/export each get
+    a small concurrency limit with a bounded wait queue, so a burst of
+    them cannot take every worker thread and starve cheap routes. Excess
+    requests are shed before their body is read, with ``Retry-After``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pools = _build_pools()
+
+    def _pool_for(self, path: str) -> Optional[AdmissionPool]:
+        for prefix, pool in self.pools:
+            if path.startswith(prefix):
+                return pool
+        return None
+
+    async def __call__(self, scope, receive, send):
+        pool = self._pool_for(scope["path"]) if scope["type"] == "http" else None
+        if pool is None:
+            await self.app(scope, receive, send)
+            return
+
+        queued_at = time.perf_counter()
+        try:
+            await pool.acquire()
+        except Rejected as rejected:
+            admission_shed.inc(pool.name, rejected.reason)
+            response = JSONResponse(
+                {"detail": f"Too many {pool.name} requests in progress, retry later"},
+                status_code=rejected.status_code,
+                headers={"Retry-After": str(rejected.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        admission_queue_wait.observe(started - queued_at, pool.name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release(time.perf_counter() - started)
@@ -0,0 +1,418 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from logging import getLogger
+from typing import Any, Dict, Optional
+import asyncio
+import math
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.firestore import get_firestore
+from app.services.scoring import CandidateArrays
+from app.services.map_grid import MapGrid
+from app.services.search import SearchIndex
+from app.services.snapshot import CatalogSnapshot, category_key, epoch_seconds
+from app.services.versioned import current_mtime
+
+logger = getLogger("uvicorn")
+
+
+def _ts(entry: tuple[float, str]) -> float:
+    return entry[0]
+
+
+def _read_changes(base: CatalogSnapshot) -> tuple[list[Dict[str, Any]], Dict[str, int]]:
+    # Events changed and attendance counts moved since ``base`` was counted
+    firestore = get_firestore()
+    since = base.counted_through
+    changed = firestore.list_events_changed_since(since)
+    count_delta: Dict[str, int] = {}
+    for attendance in firestore.stream_attendances(since=since):
+        count_delta[attendance["event_id"]] = count_delta.get(attendance["event_id"], 0) + 1
+    for deletion in firestore.stream_attendance_deletions(since=since):
+        # Attendances created after ``since`` already left the query above
+        if deletion["created_at"] <= since:
+            count_delta[deletion["event_id"]] = count_delta.get(deletion["event_id"], 0) - 1
+    return changed, count_delta
+
+
+class EventCatalog:
+    """In-process view of the active events.
+
+    The bulk of the catalog is a columnar ``CatalogSnapshot``: memory-mapped
+    from ``snapshot_path`` when ``app.jobs.snapshot_catalog`` has published
+    one, so workers share its pages, or built from a Firestore scan
+    otherwise. Events changed since the snapshot are held in a small
+    overlay with a category index and two sorted (timestamp, id) lists over
+    start_date / end_date, and shadow their snapshot rows. Attendance counts
+    are the snapshot's plus those created since, minus the snapshot-counted
+    ones deleted since according to the deletion log every worker writes.
+
+    The overlay and counts are re-read from Firestore every ``ttl_seconds``
+    and patched in place by the write routes in between. The snapshot is
+    swapped when a new version is published; without a published snapshot
+    the in-memory one is rebuilt after ``full_reload_seconds``. Both happen
+    in the background (see ``refresh``) while requests use the installed
+    copy.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        full_reload_seconds: float,
+        snapshot_path: str,
+        search_index_path: Optional[str] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.snapshot_path = snapshot_path
+        self.search_index_path = search_index_path
+        self._base: Optional[CatalogSnapshot] = None
+        self._base_version: Optional[int] = None
+        self._base_loaded_at: Optional[float] = None
+        self._refreshed_at: Optional[float] = None
+        self._shadowed = np.zeros(0, dtype=bool)
+        self._counts = np.zeros(0, dtype=np.int64)
+        # Attendances created minus deleted since the snapshot counts, per event
+        self._count_delta: Dict[str, int] = {}
+        self._tombstones: set[str] = set()
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._spans: Dict[str, tuple[float, float]] = {}
+        self._by_category: Dict[str, set[str]] = {}
+        self._starts: list[tuple[float, str]] = []
+        self._ends: list[tuple[float, str]] = []
+        # Built on first use; their overlays follow the one above
+        self._search: Optional[SearchIndex] = None
+        self._search_task: Optional[asyncio.Future] = None
+        self._map_grid: Optional[MapGrid] = None
+        self._refresh_task: Optional[asyncio.Future] = None
+        self._refresh_failed_at = -math.inf
+        # Events this worker wrote while refresh was reading, replayed onto what it installs
+        self._writes_while_loading: Optional[list[Dict[str, Any]]] = None
+
+    def _stale(self, version: Optional[int]) -> bool:
+        return (
+            self._base is None
+            or version != self._base_version
+            or (version is None and time.monotonic() - self._base_loaded_at >= self.full_reload_seconds)
+        )
+
+    def _ensure_loaded(self) -> None:
+        if self._base is None:
+            # Nothing to serve yet, e.g. called before warm-up: load in place
+            version = current_mtime(self.snapshot_path)
+            self.load(self._read_base(version), version)
+        elif time.monotonic() - self._refresh_failed_at >= self.ttl_seconds and (
+            self._stale(current_mtime(self.snapshot_path))
+            or time.monotonic() - self._refreshed_at >= self.ttl_seconds
+        ):
+            # Callers keep the installed copy until the reloaded one is in
+            self._start_refresh()
+
+    def _start_refresh(self) -> asyncio.Future:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self.refresh())
+            self._refresh_task.add_done_callback(self._refresh_done)
+        return self._refresh_task
+
+    def _refresh_done(self, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            # The installed copy stays in use; retried a TTL later
+            self._refresh_failed_at = time.monotonic()
+            logger.error("Catalog refresh failed", exc_info=task.exception())
+
+    async def warm_up(self) -> int:
+        """Load the catalog if needed without blocking the event loop; returns the event count."""
+        if self._stale(current_mtime(self.snapshot_path)):
+            await self._start_refresh()
+        return len(self.candidates())
+
+    async def refresh(self) -> None:
+        """Re-read the catalog in a worker thread and install it on the event loop.
+
+        The snapshot is swapped when a new version is published, or rebuilt
+        after ``full_reload_seconds`` without one; otherwise only the events
+        and attendances changed since it are re-read. The reads touch no
+        shared state, and events this worker writes meanwhile are replayed
+        onto what is installed.
+        """
+        version = current_mtime(self.snapshot_path)
+        stale = self._stale(version)
+        self._writes_while_loading = []
+        try:
+            base = await asyncio.to_thread(self._read_base, version) if stale else self._base
+            changes = await asyncio.to_thread(_read_changes, base)
+        finally:
+            writes, self._writes_while_loading = self._writes_while_loading, None
+        if stale:
+            self.load(base, version, changes)
+        else:
+            self._install_changes(*changes)
+        for event in writes:
+            self._apply(event)
+
+    def _read_base(self, version: Optional[int]) -> CatalogSnapshot:
+        base = CatalogSnapshot.load(self.snapshot_path) if version is not None else None
+        return base or CatalogSnapshot.from_firestore(get_firestore())
+
+    def load(
+        self,
+        base: CatalogSnapshot,
+        version: Optional[int] = None,
+        changes: Optional[tuple[list[Dict[str, Any]], Dict[str, int]]] = None,
+    ) -> None:
+        self._base = base
+        self._base_version = version
+        self._base_loaded_at = time.monotonic()
+        self._search = None
+        self._map_grid = None
+        self._install_changes(*(changes if changes is not None else _read_changes(base)))
+
+    def _install_changes(self, changed: list[Dict[str, Any]], count_delta: Dict[str, int]) -> None:
+        self._shadowed = np.zeros(len(self._base), dtype=bool)
+        self._tombstones = set()
+        self._events = {}
+        self._spans = {}
+        self._by_category = {}
+        self._starts = []
+        self._ends = []
+        for index in self._derived_indexes():
+            index.clear_overlay()
+        for event in changed:
+            self._apply(event)
+
+        self._count_delta = count_delta
+        self._counts = np.array(self._base.arrays.count, dtype=np.int64)
+        if count_delta:
+            values = np.fromiter(count_delta.values(), dtype=np.int64, count=len(count_delta))
+            rows, which = self._base.arrays.rows_of(count_delta.keys())
+            np.add.at(self._counts, rows, values[which])
+        self._refreshed_at = time.monotonic()
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        event_id = event["id"]
+        self._unindex(event_id)
+        self._tombstones.discard(event_id)
+        row = self._base.row_of(event_id)
+        if row is not None:
+            self._shadowed[row] = True
+        if not event.get("active", True):
+            self._tombstones.add(event_id)
+            for index in self._derived_indexes():
+                index.discard(event_id)
+            return
+
+        self._events[event_id] = event
+        for index in self._derived_indexes():
+            index.put(event)
+        start = epoch_seconds(event.get("start_date"), -math.inf)
+        end = epoch_seconds(event.get("end_date"), math.inf)
+        self._spans[event_id] = (start, end)
+        key = category_key(event.get("category"))
+        if key:
+            self._by_category.setdefault(key, set()).add(event_id)
+        insort(self._starts, (start, event_id))
+        insort(self._ends, (end, event_id))
+
+    def _derived_indexes(self) -> list:
+        # Search index and map grid, once built
+        return [index for index in (self._search, self._map_grid) if index is not None]
+
+    def _unindex(self, event_id: str) -> None:
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        start, end = self._spans.pop(event_id)
+        self._starts.pop(bisect_left(self._starts, (start, event_id)))
+        self._ends.pop(bisect_left(self._ends, (end, event_id)))
+        key = category_key(event.get("category"))
+        if key:
+            ids = self._by_category.get(key)
+            ids.discard(event_id)
+            if not ids:
+                del self._by_category[key]
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self.peek(event_id)
+
+    def peek(self, event_id: str) -> Optional[Dict[str, Any]]:
+        # Like get() but never triggers a load; for callers on a write path
+        if self._base is None or event_id in self._tombstones:
+            return None
+        event = self._events.get(event_id)
+        if event is not None:
+            return event
+        row = self._base.row_of(event_id)
+        return self._base.doc(row) if row is not None else None
+
+    def upsert(self, event: Dict[str, Any]) -> None:
+        if self._writes_while_loading is not None:
+            self._writes_while_loading.append(event)
+        if self._base is None:
+            return
+        self._apply(event)
+
+    def remove(self, event_id: str) -> None:
+        self.upsert({"id": event_id, "active": False})
+
+    def count(self, event_id: str) -> int:
+        row = self._base.row_of(event_id)
+        if row is not None:
+            return int(self._counts[row])
+        return self._count_delta.get(event_id, 0)
+
+    def adjust_count(self, event_id: str, delta: int) -> None:
+        """Apply an attendance this worker created (+1) or deleted (-1) until the next refresh."""
+        if self._base is None:
+            return
+        self._count_delta[event_id] = self._count_delta.get(event_id, 0) + delta
+        row = self._base.row_of(event_id)
+        if row is not None:
+            self._counts[row] += delta
+
+    def candidates(
+        self,
+        category: Optional[str] = None,
+        starts_after: Optional[datetime] = None,
+        ends_before: Optional[datetime] = None,
+        not_ended_at: Optional[datetime] = None,
+    ) -> CandidateArrays:
+        """Scoring columns for the active events matching every given filter.
+
+        Snapshot rows are filtered with vectorized comparisons; overlay
+        events go through their own indexes and are appended after them.
+        """
+        self._ensure_loaded()
+        lo = epoch_seconds(starts_after, -math.inf)
+        hi = epoch_seconds(ends_before, math.inf)
+        not_before = epoch_seconds(not_ended_at, -math.inf)
+
+        rows = self._base.select(category, lo, hi, not_before)
+        rows = rows[~self._shadowed[rows]]
+        arrays = self._base.arrays.take(rows, self._counts[rows])
+
+        overlay = self._select_overlay(category, lo, hi, not_before)
+        if not overlay:
+            return arrays
+        counts = {event["id"]: self.count(event["id"]) for event in overlay}
+        extra = CandidateArrays.from_events(
+            overlay, counts, categories=arrays.categories, amenity_bits=arrays.amenity_bits
+        )
+        return CandidateArrays.concat(arrays, extra)
+
+    def search_index(self) -> Optional[SearchIndex]:
+        """The search index, or None while it is loaded or built in the background.
+
+        Building takes seconds for a large snapshot, so it runs in a worker
+        thread; the index is installed on the event loop, with the overlay
+        events of that moment, unless the snapshot was swapped meanwhile.
+        """
+        self._ensure_loaded()
+        if self._search is None and (self._search_task is None or self._search_task.done()):
+            self._search_task = asyncio.ensure_future(self._build_search_index())
+        return self._search
+
+    async def wait_for_search_index(self) -> Optional[SearchIndex]:
+        """The search index once built; None if the build failed."""
+        if self.search_index() is None:
+            await self._search_task
+        return self._search
+
+    async def _build_search_index(self) -> None:
+        try:
+            while self._search is None:
+                base = self._base
+                index = await asyncio.to_thread(self._read_search_index, base)
+                if base is self._base:
+                    for event in self._events.values():
+                        index.put(event)
+                    self._search = index
+        except Exception:
+            logger.exception("Search index build failed")
+
+    def _read_search_index(self, base: CatalogSnapshot) -> SearchIndex:
+        published = SearchIndex.load(self.search_index_path, base) if self.search_index_path else None
+        return published or SearchIndex.build(base)
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        origin: Optional[tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+    ) -> Optional[list[str]]:
+        """Ids of the active events best matching ``query``, best first; None until the index is built."""
+        index = self.search_index()
+        if index is None:
+            return None
+        return [event_id for event_id, _ in index.search(query, limit, self._shadowed, origin, radius_km)]
+
+    def map_view(
+        self, south: float, west: float, north: float, east: float, zoom: int
+    ) -> Dict[str, Any]:
+        """Event clusters, or events at high zoom, inside a bounding box."""
+        self._ensure_loaded()
+        if self._map_grid is None:
+            self._map_grid = MapGrid(self._base)
+            for event in self._events.values():
+                self._map_grid.put(event)
+        return self._map_grid.view(south, west, north, east, zoom, self._shadowed)
+
+    def _select_overlay(
+        self, category: Optional[str], lo: float, hi: float, not_before: float
+    ) -> list[Dict[str, Any]]:
+        # Each filter is resolved through its index to a candidate id set;
+        # only the smallest one is walked and checked against the others.
+        # (size, ids) for set-backed filters, (size, sorted list, i, j) for ranges
+        candidates = []
+        if category is not None:
+            ids = self._by_category.get(category_key(category), set())
+            candidates.append((len(ids), ids))
+        if lo > -math.inf:
+            i = bisect_left(self._starts, lo, key=_ts)
+            candidates.append((len(self._starts) - i, self._starts, i, len(self._starts)))
+        if hi < math.inf:
+            j = bisect_right(self._ends, hi, key=_ts)
+            candidates.append((j, self._ends, 0, j))
+        if not_before > -math.inf:
+            i = bisect_left(self._ends, not_before, key=_ts)
+            candidates.append((len(self._ends) - i, self._ends, i, len(self._ends)))
+        if not candidates:
+            return [self._events[event_id] for event_id in sorted(self._events)]
+
+        smallest = min(candidates, key=lambda c: c[0])
+        if len(smallest) == 2:
+            # Sets iterate in hash order; keep ranking ties stable
+            event_ids = sorted(smallest[1])
+        else:
+            _, entries, i, j = smallest
+            event_ids = [eid for _, eid in entries[i:j]]
+
+        key = category_key(category)
+        selected = []
+        for event_id in event_ids:
+            start, end = self._spans[event_id]
+            if start < lo or end > hi or end < not_before:
+                continue
+            if key is not None and category_key(self._events[event_id].get("category")) != key:
+                continue
+            selected.append(self._events[event_id])
+        return selected
+
+
+_catalog = None
+
+
+def get_catalog() -> EventCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = EventCatalog(
+            settings.catalog_ttl_seconds,
+            settings.catalog_full_reload_seconds,
+            settings.catalog_snapshot_path,
+            settings.search_index_path,
+        )
+    return _catalog
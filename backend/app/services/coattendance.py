@@ -0,0 +1,152 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import json
+import math
+import os
+import pickle
+
+import numpy as np
+
+from app.config import settings
+from app.services.versioned import current_mtime, current_version_dir, new_version_dir, publish
+
+STATE_FILE = "state.pkl"
+
+
+class CoAttendanceBuilder:
+    """Accumulates device -> events history and pairwise co-attendance counts.
+
+    Counts are kept exactly so the builder can be pickled between job runs
+    and extended with only the attendances created since the last run.
+    """
+
+    def __init__(self):
+        self.device_events: Dict[str, set[str]] = {}
+        self.event_counts: Dict[str, int] = {}
+        self.pair_counts: Dict[str, Dict[str, int]] = {}
+        self.last_timestamp: Optional[datetime] = None
+
+    def add(self, device_id: str, event_id: str, timestamp: Optional[datetime] = None) -> None:
+        if timestamp is not None and (self.last_timestamp is None or timestamp > self.last_timestamp):
+            self.last_timestamp = timestamp
+        events = self.device_events.setdefault(device_id, set())
+        if event_id in events:
+            return
+        row = self.pair_counts.setdefault(event_id, {})
+        for other in events:
+            row[other] = row.get(other, 0) + 1
+            other_row = self.pair_counts.setdefault(other, {})
+            other_row[event_id] = other_row.get(event_id, 0) + 1
+        events.add(event_id)
+        self.event_counts[event_id] = self.event_counts.get(event_id, 0) + 1
+
+    def build(self, top_k: int) -> "CoAttendanceMatrix":
+        """Cosine similarity over attendee sets, top ``top_k`` per event."""
+        event_ids = sorted(self.pair_counts)
+        index = {event_id: i for i, event_id in enumerate(event_ids)}
+        indptr = [0]
+        indices: list[int] = []
+        scores: list[float] = []
+        for event_id in event_ids:
+            n_a = self.event_counts[event_id]
+            row = [
+                (co / math.sqrt(n_a * self.event_counts[other]), other)
+                for other, co in self.pair_counts[event_id].items()
+            ]
+            row.sort(key=lambda item: (-item[0], item[1]))
+            for score, other in row[:top_k]:
+                indices.append(index[other])
+                scores.append(score)
+            indptr.append(len(indices))
+        return CoAttendanceMatrix(
+            event_ids,
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int32),
+            np.array(scores, dtype=np.float32),
+        )
+
+
+class CoAttendanceMatrix:
+    """Top-k item-to-item similarity in CSR form.
+
+    Row ``i`` holds the neighbours of ``event_ids[i]`` in
+    ``indices[indptr[i]:indptr[i + 1]]`` with matching ``scores``.
+    """
+
+    def __init__(self, event_ids: list[str], indptr: np.ndarray, indices: np.ndarray, scores: np.ndarray):
+        self.event_ids = event_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.row_by_id = {event_id: i for i, event_id in enumerate(event_ids)}
+
+    def neighbours(self, event_id: str) -> Dict[str, float]:
+        row = self.row_by_id.get(event_id)
+        if row is None:
+            return {}
+        lo, hi = self.indptr[row], self.indptr[row + 1]
+        return {self.event_ids[i]: float(s) for i, s in zip(self.indices[lo:hi], self.scores[lo:hi])}
+
+    def blend(self, attended_ids: Iterable[str]) -> Dict[str, float]:
+        """Summed neighbour similarity from every attended event."""
+        totals: Dict[str, float] = {}
+        for event_id in attended_ids:
+            for other, score in self.neighbours(event_id).items():
+                totals[other] = totals.get(other, 0.0) + score
+        return totals
+
+    def save(self, path: str) -> str:
+        """Write a new version under ``path`` and point CURRENT at it."""
+        version_dir = new_version_dir(path)
+        np.save(os.path.join(version_dir, "indptr.npy"), self.indptr)
+        np.save(os.path.join(version_dir, "indices.npy"), self.indices)
+        np.save(os.path.join(version_dir, "scores.npy"), self.scores)
+        with open(os.path.join(version_dir, "event_ids.json"), "w") as f:
+            json.dump(self.event_ids, f)
+        publish(path, version_dir)
+        return version_dir
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CoAttendanceMatrix"]:
+        version_dir = current_version_dir(path)
+        if version_dir is None:
+            return None
+        with open(os.path.join(version_dir, "event_ids.json")) as f:
+            event_ids = json.load(f)
+        return cls(
+            event_ids,
+            np.load(os.path.join(version_dir, "indptr.npy"), mmap_mode="r"),
+            np.load(os.path.join(version_dir, "indices.npy"), mmap_mode="r"),
+            np.load(os.path.join(version_dir, "scores.npy"), mmap_mode="r"),
+        )
+
+
+def load_state(path: str) -> Optional[CoAttendanceBuilder]:
+    try:
+        with open(os.path.join(path, STATE_FILE), "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(path: str, builder: CoAttendanceBuilder) -> None:
+    tmp = os.path.join(path, STATE_FILE + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(builder, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, os.path.join(path, STATE_FILE))
+
+
+_matrix = None
+_matrix_mtime = None
+
+
+def get_coattendance() -> Optional[CoAttendanceMatrix]:
+    """Current matrix, reloaded whenever the job publishes a new version."""
+    global _matrix, _matrix_mtime
+    mtime = current_mtime(settings.coattendance_path)
+    if mtime is None:
+        return None
+    if mtime != _matrix_mtime:
+        _matrix = CoAttendanceMatrix.load(settings.coattendance_path)
+        _matrix_mtime = mtime
+    return _matrix
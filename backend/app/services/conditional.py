@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import calendar
+
+from fastapi import HTTPException, Response, status
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+# Clients may keep a copy but revalidate it on every use, which costs a 304
+EVENT_CACHE_CONTROL = "no-cache"
+PREFERENCE_CACHE_CONTROL = "private, no-cache"
+
+
+def etag_for(doc: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Strong ETag of a document: its ``updated_at`` as ``"<seconds>.<nanoseconds>"``.
+
+    Every write sets ``updated_at`` to the server timestamp, so it equals
+    the document's Firestore update time and the tag can be turned back
+    into a write precondition (see ``precondition``).
+    """
+    updated_at = doc.get("updated_at") if doc else None
+    if not isinstance(updated_at, datetime):
+        return None
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    nanos = getattr(updated_at, "nanosecond", updated_at.microsecond * 1000)
+    return f'"{calendar.timegm(updated_at.utctimetuple())}.{nanos:09d}"'
+
+
+def _update_time_of(etag: str) -> Optional[datetime]:
+    if not (len(etag) > 2 and etag[0] == etag[-1] == '"'):
+        return None
+    try:
+        seconds, nanos = (int(part) for part in etag[1:-1].split("."))
+    except ValueError:
+        return None
+    if not 0 <= nanos < 10**9:
+        return None
+    dt = datetime.fromtimestamp(seconds, timezone.utc)
+    return DatetimeWithNanoseconds(*dt.timetuple()[:6], nanosecond=nanos, tzinfo=timezone.utc)
+
+
+def _tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def is_current(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Whether ``If-None-Match`` names ``etag``, i.e. the client's copy is current.
+
+    Uses the weak comparison RFC 9110 prescribes for ``If-None-Match``.
+    """
+    if not if_none_match or etag is None:
+        return False
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in _tags(if_none_match))
+
+
+def validators(etag: Optional[str], cache_control: str) -> Dict[str, str]:
+    headers = {"Cache-Control": cache_control}
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators(etag, cache_control))
+
+
+def precondition(if_match: Optional[str]) -> Optional[datetime]:
+    """Update time an ``If-Match`` header pins a write to.
+
+    None without the header or for ``*``. A header that can never match
+    one of our ETags (weak, malformed or a list of several) is answered
+    with 412 right away.
+    """
+    if not if_match:
+        return None
+    tags = _tags(if_match)
+    if tags == ["*"]:
+        return None
+    update_time = _update_time_of(tags[0]) if len(tags) == 1 else None
+    if update_time is None:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match must be a single ETag returned by this API"
+        )
+    return update_time
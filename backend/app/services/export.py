@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Iterator, Optional
+import zlib
+
+from app.services.firestore import FirestoreService
+from app.services.serialization import dumps
+
+# Field compared against ``since`` in incremental exports. Events and
+# preferences carry updated_at on every write; attendances never change.
+# Documents written before updated_at existed are only in full exports.
+SINCE_FIELDS = {
+    "events": "updated_at",
+    "attendances": "timestamp",
+    "preferences": "updated_at",
+}
+
+
+def export_lines(
+    firestore_service: FirestoreService, collection: str, since: Optional[datetime] = None
+) -> Iterator[bytes]:
+    """One NDJSON line per document in ``collection``, encoded like the API's responses."""
+    name = {
+        "events": firestore_service.collection_name,
+        "attendances": firestore_service.attendances_collection,
+        "preferences": firestore_service.preferences_collection,
+    }[collection]
+    for doc in firestore_service.stream_collection(name, since=since, since_field=SINCE_FIELDS[collection]):
+        yield dumps(doc) + b"\n"
+
+
+def gzip_stream(chunks: Iterator[bytes], flush_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """Compress ``chunks`` into a single gzip member without buffering it all."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = 0
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if out:
+            yield out
+        if pending >= flush_bytes:
+            # Push out what we have so slow exports still make progress
+            yield compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+    yield compressor.flush()
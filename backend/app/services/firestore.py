@@ -1,27 +1,72 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 from datetime import datetime
+import hashlib
 import uuid
-import firebase_admin
-from  firebase_admin import credentials, firestore
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition
 from app.config import settings
+from app.firebase import init_firebase
+from app.services.lru import LRUCache, MISSING
+from app.services.metrics import instrument_methods
+
+# Field path Firestore uses for the document id in order_by / cursors
+DOCUMENT_ID = "__name__"
+
+# Maximum number of writes in one batched commit
+BATCH_LIMIT = 500
 
 
 class FirestoreService:
     
     def __init__(self):
-        if not firebase_admin._apps:
-            firebase_creds = settings.get_firebase_credentials()
-            cred = credentials.Certificate(firebase_creds)
-            firebase_admin.initialize_app(cred)
-        
+        init_firebase()
         self.db = firestore.client()
         self.collection_name = settings.firestore_collection
         self.attendances_collection = "attendances"
+        self.attendance_deletions_collection = "attendance_deletions"
         self.preferences_collection = "preferences"
+        self.reminders_collection = "reminders"
+        # device_id -> preference dict, or None for devices without one
+        self._preference_cache = LRUCache(settings.preference_cache_size, settings.preference_cache_ttl_seconds)
     
-    def create_event(self, event_data: Dict[str, Any]) -> str:
+    def _update_returning(
+        self,
+        ref,
+        updates: Dict[str, Any],
+        base: Optional[Dict[str, Any]],
+        expected_update_time: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Apply ``updates`` and return the full document as written.
+
+        When the caller holds a copy of the document (``base``) the write is
+        conditioned on its ``updated_at``; if that matches the stored update
+        time the copy was current and merging it with ``updates`` is exact,
+        so no read is needed. Otherwise fall back to write + read. Raises
+        NotFound if the document does not exist.
+
+        With ``expected_update_time`` (an ``If-Match`` from the client) the
+        write only happens if the document is still at that version, and
+        FailedPrecondition is raised otherwise.
+        """
+        payload = {**updates, "updated_at": firestore.SERVER_TIMESTAMP}
+        if expected_update_time is not None:
+            result = ref.update(payload, option=self.db.write_option(last_update_time=expected_update_time))
+            if base is not None and base.get("updated_at") == expected_update_time:
+                return {**base, **updates, "updated_at": result.update_time}
+            return ref.get().to_dict()
+        if base is not None and base.get("updated_at") is not None:
+            try:
+                result = ref.update(payload, option=self.db.write_option(last_update_time=base["updated_at"]))
+                return {**base, **updates, "updated_at": result.update_time}
+            except FailedPrecondition:
+                pass
+        ref.update(payload)
+        return ref.get().to_dict()
+    
+    @staticmethod
+    def new_event_doc(event_data: Dict[str, Any]) -> Dict[str, Any]:
         event_id = f"evt_{uuid.uuid4().hex[:12]}"
-        event = {
+        return {
             "id": event_id,
             "name": event_data.get("name"),
             "description": event_data.get("description"),
@@ -32,10 +77,44 @@ class FirestoreService:
             "max_attendance": event_data.get("max_attendance"),
             "amenities": event_data.get("amenities"),
             "active": True,
-            "timestamp": datetime.utcnow()
+            "timestamp": firestore.SERVER_TIMESTAMP,
+            "updated_at": firestore.SERVER_TIMESTAMP,
         }
-        self.db.collection(self.collection_name).document(event_id).set(event)
-        return event_id
+    
+    def create_event(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        event = self.new_event_doc(event_data)
+        result = self.db.collection(self.collection_name).document(event["id"]).create(event)
+        return {**event, "timestamp": result.update_time, "updated_at": result.update_time}
+    
+    def create_events(self, events_data: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        """Create up to BATCH_LIMIT events in one atomic batched write."""
+        return self.commit_new_events([self.new_event_doc(event_data) for event_data in events_data])
+    
+    def commit_new_events(self, events: list[Dict[str, Any]], retry: bool = False) -> list[Dict[str, Any]]:
+        """Create documents built by ``new_event_doc`` in one atomic batched write.
+
+        The batch is all-or-nothing, so AlreadyExists on a ``retry`` of the
+        same documents means an earlier attempt committed and only its
+        response was lost: the stored documents are read back instead.
+        """
+        batch = self.db.batch()
+        collection = self.db.collection(self.collection_name)
+        for event in events:
+            batch.create(collection.document(event["id"]), event)
+        try:
+            results = batch.commit()
+        except AlreadyExists:
+            if not retry:
+                raise
+            stored = {
+                doc.id: doc.to_dict()
+                for doc in self.db.get_all([collection.document(event["id"]) for event in events])
+            }
+            return [stored[event["id"]] for event in events]
+        return [
+            {**event, "timestamp": result.update_time, "updated_at": result.update_time}
+            for event, result in zip(events, results)
+        ]
     
     def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
         doc = self.db.collection(self.collection_name).document(event_id).get()
@@ -43,22 +122,37 @@ class FirestoreService:
             return doc.to_dict()
         return None
     
-    def update_event(self, event_id: str, updates: Dict[str, Any]) -> bool:
-        self.db.collection(self.collection_name).document(event_id).update(updates)
-        return True
+    def update_event(
+        self,
+        event_id: str,
+        updates: Dict[str, Any],
+        base: Optional[Dict[str, Any]] = None,
+        expected_update_time: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        ref = self.db.collection(self.collection_name).document(event_id)
+        return self._update_returning(ref, updates, base, expected_update_time)
+    
+    def deactivate_event(self, event_id: str) -> None:
+        # update() fails with NotFound on a missing document: no prior read needed
+        self.db.collection(self.collection_name).document(event_id).update(
+            {"active": False, "updated_at": firestore.SERVER_TIMESTAMP}
+        )
     
-    def create_attendance(self, attendance_data: Dict[str, Any]) -> str:
-        attendance_id = f"att_{uuid.uuid4().hex[:12]}"
+    def create_attendance(self, attendance_data: Dict[str, Any]) -> Dict[str, Any]:
+        # One id per (event, device): a concurrent duplicate registration
+        # fails the create() precondition with AlreadyExists
+        key = f"{attendance_data.get('event_id')}:{attendance_data.get('device_id')}"
+        attendance_id = f"att_{hashlib.sha1(key.encode()).hexdigest()[:12]}"
         
         attendance = {
             "id": attendance_id,
             "event_id": attendance_data.get("event_id"),
             "device_id": attendance_data.get("device_id"),
-            "timestamp": datetime.utcnow()
+            "timestamp": firestore.SERVER_TIMESTAMP
         }
         
-        self.db.collection(self.attendances_collection).document(attendance_id).set(attendance)
-        return attendance_id
+        result = self.db.collection(self.attendances_collection).document(attendance_id).create(attendance)
+        return {**attendance, "timestamp": result.update_time}
     
     def get_attendance(self, attendance_id: str) -> Optional[Dict[str, Any]]:
         doc = self.db.collection(self.attendances_collection).document(attendance_id).get()
@@ -66,20 +160,43 @@ class FirestoreService:
             return doc.to_dict()
         return None
     
-    def delete_attendance(self, attendance_id: str) -> bool:
-        self.db.collection(self.attendances_collection).document(attendance_id).delete()
-        return True
+    def delete_attendance(self, attendance: Dict[str, Any]) -> None:
+        """Delete ``attendance`` and log the deletion in the same commit.
+
+        Attendance counts kept by other processes learn of the deletion
+        from the log (``stream_attendance_deletions``).
+        """
+        batch = self.db.batch()
+        batch.delete(self.db.collection(self.attendances_collection).document(attendance["id"]))
+        batch.create(self.db.collection(self.attendance_deletions_collection).document(), {
+            "event_id": attendance["event_id"],
+            "created_at": attendance.get("timestamp"),
+            "deleted_at": firestore.SERVER_TIMESTAMP,
+        })
+        batch.commit()
     
     def count_attendances_for_event(self, event_id: str) -> int:
+        # count() aggregation: counted server-side, no documents are transferred
         query = self.db.collection(self.attendances_collection).where("event_id", "==", event_id)
-        return len(list(query.stream()))
+        return int(query.count().get()[0][0].value)
+    
+    def list_attendee_devices(self, event_id: str) -> list[str]:
+        # Capacity and duplicate checks share this one projected query
+        query = (
+            self.db.collection(self.attendances_collection)
+            .where("event_id", "==", event_id)
+            .select(["device_id"])
+        )
+        return [doc.get("device_id") for doc in query.stream()]
     
     def check_device_attendance(self, event_id: str, device_id: str) -> bool:
         query = self.db.collection(self.attendances_collection).where("event_id", "==", event_id).where("device_id", "==", device_id)
         return len(list(query.stream())) > 0
     
-    def create_preference(self, preference_data: Dict[str, Any]) -> str:
-        preference_id = f"prf_{uuid.uuid4().hex[:12]}"
+    def upsert_preference(self, preference_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Preferences are keyed by device: repeated onboarding overwrites
+        # the same document instead of piling up duplicates
+        preference_id = preference_data.get("device_id")
         
         preference = {
             "id": preference_id,
@@ -92,42 +209,200 @@ class FirestoreService:
             "chat_times": preference_data.get("chat_times"),
             "activity_type": preference_data.get("activity_type"),
             "looking_for": preference_data.get("looking_for"),
-            "timestamp": datetime.utcnow()
         }
         
-        self.db.collection(self.preferences_collection).document(preference_id).set(preference)
-        return preference_id
+        ref = self.db.collection(self.preferences_collection).document(preference_id)
+        try:
+            result = ref.create(
+                {**preference, "timestamp": firestore.SERVER_TIMESTAMP, "updated_at": firestore.SERVER_TIMESTAMP}
+            )
+            preference = {**preference, "timestamp": result.update_time, "updated_at": result.update_time}
+        except AlreadyExists:
+            # An update keeps the creation timestamp; only updated_at moves
+            preference = self._update_returning(ref, preference, self._preference_cache.get(preference_id, None))
+        self._preference_cache.put(preference_id, preference)
+        return preference
     
     def get_preference(self, preference_id: str) -> Optional[Dict[str, Any]]:
         doc = self.db.collection(self.preferences_collection).document(preference_id).get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
+        preference = doc.to_dict() if doc.exists else None
+        self._preference_cache.put(preference_id, preference)
+        return preference
+
+    def peek_preference(self, preference_id: str) -> Optional[Dict[str, Any]]:
+        # Cached copy only, never a read; up to preference_cache_ttl_seconds old
+        return self._preference_cache.get(preference_id, None)
     
-    def update_preference(self, preference_id: str, updates: Dict[str, Any]) -> bool:
-        self.db.collection(self.preferences_collection).document(preference_id).update(updates)
-        return True
+    def update_preference(
+        self, preference_id: str, updates: Dict[str, Any], expected_update_time: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        ref = self.db.collection(self.preferences_collection).document(preference_id)
+        base = self._preference_cache.get(preference_id, None)
+        updated = self._update_returning(ref, updates, base, expected_update_time)
+        self._preference_cache.put(preference_id, updated)
+        return updated
     
-    def delete_preference(self, preference_id: str) -> bool:
-        self.db.collection(self.preferences_collection).document(preference_id).delete()
-        return True
+    def delete_preference(self, preference_id: str) -> None:
+        # Raises NotFound instead of silently deleting nothing
+        self.db.collection(self.preferences_collection).document(preference_id).delete(
+            option=self.db.write_option(exists=True)
+        )
+        self._preference_cache.pop(preference_id)
 
     def list_events(self) -> list[Dict[str, Any]]:
         query = self.db.collection(self.collection_name).where("active", "==", True)
         return [doc.to_dict() for doc in query.stream()]
 
+    def list_events_changed_since(self, since: datetime) -> list[Dict[str, Any]]:
+        # Includes deactivated events so callers can drop their copies
+        query = self.db.collection(self.collection_name).where("updated_at", ">", since)
+        return [doc.to_dict() for doc in query.stream()]
+
+    def list_upcoming_events(self, after: datetime) -> list[Dict[str, Any]]:
+        # A single-field range needs no composite index; inactive events are dropped here
+        query = self.db.collection(self.collection_name).where("start_date", ">", after)
+        return [event for event in (doc.to_dict() for doc in query.stream()) if event.get("active", True)]
+
+    def mark_reminded(self, event_id: str, start_date: datetime) -> None:
+        # Kept off the event document so its updated_at, and with it the ETag, does not move
+        self.db.collection(self.reminders_collection).document(event_id).set(
+            {"event_id": event_id, "sent_for": start_date}
+        )
+
+    def list_reminded(self, after: datetime) -> Dict[str, datetime]:
+        """Event id -> start date its reminders went out for, for starts after ``after``."""
+        query = self.db.collection(self.reminders_collection).where("sent_for", ">", after)
+        return {reminder["event_id"]: reminder["sent_for"] for reminder in (doc.to_dict() for doc in query.stream())}
+
+    def stream_events_page(
+        self,
+        limit: int,
+        start_after: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        query = (
+            self.db.collection(self.collection_name)
+            .where("active", "==", True)
+            .order_by(DOCUMENT_ID)
+            .limit(limit)
+        )
+        if start_after:
+            query = query.start_after({DOCUMENT_ID: start_after})
+        if fields:
+            query = query.select(fields)
+        for doc in query.stream():
+            data = doc.to_dict()
+            data["id"] = doc.id
+            yield data
+
     def list_attendances_by_device(self, device_id: str) -> list[Dict[str, Any]]:
         query = self.db.collection(self.attendances_collection).where("device_id", "==", device_id)
         return [doc.to_dict() for doc in query.stream()]
 
+    def stream_attendances(self, since: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        query = self.db.collection(self.attendances_collection)
+        if since is not None:
+            query = query.where("timestamp", ">", since)
+        query = query.order_by("timestamp").select(["event_id", "device_id", "timestamp"])
+        for doc in query.stream():
+            yield doc.to_dict()
+
+    def stream_attendance_deletions(self, since: datetime) -> Iterator[Dict[str, Any]]:
+        query = (
+            self.db.collection(self.attendance_deletions_collection)
+            .where("deleted_at", ">", since)
+            .order_by("deleted_at")
+        )
+        for doc in query.stream():
+            yield doc.to_dict()
+
+    def prune_attendance_deletions(self, before: datetime) -> int:
+        """Drop logged deletions made at or before ``before``; returns how many."""
+        query = (
+            self.db.collection(self.attendance_deletions_collection)
+            .where("deleted_at", "<=", before)
+            .select([])
+            .limit(BATCH_LIMIT)
+        )
+        pruned = 0
+        while True:
+            refs = [doc.reference for doc in query.stream()]
+            if not refs:
+                return pruned
+            batch = self.db.batch()
+            for ref in refs:
+                batch.delete(ref)
+            batch.commit()
+            pruned += len(refs)
+            if len(refs) < BATCH_LIMIT:
+                return pruned
+
+    def stream_collection(
+        self,
+        collection: str,
+        since: Optional[datetime] = None,
+        since_field: str = "timestamp",
+        page_size: int = 1000,
+    ) -> Iterator[Dict[str, Any]]:
+        """Every document in ``collection``, fetched one page at a time.
+
+        With ``since`` only documents whose ``since_field`` is later are
+        returned, in that field's order. Paging keeps each RPC short and
+        memory flat regardless of collection size.
+        """
+        query = self.db.collection(collection)
+        if since is not None:
+            query = query.where(since_field, ">", since).order_by(since_field)
+        query = query.order_by(DOCUMENT_ID).limit(page_size)
+        cursor = None
+        while True:
+            page = query if cursor is None else query.start_after(cursor)
+            count = 0
+            for doc in page.stream():
+                data = doc.to_dict()
+                cursor = {DOCUMENT_ID: doc.id}
+                if since is not None:
+                    cursor[since_field] = data.get(since_field)
+                count += 1
+                yield data
+            if count < page_size:
+                return
+
+    def ping(self) -> None:
+        # Smallest possible read; opens and authenticates the gRPC channel
+        for _ in self.db.collection(self.collection_name).limit(1).select([]).stream():
+            pass
+
+    def recent_preferences(self, limit: int) -> list[tuple[str, Dict[str, Any]]]:
+        """(device id, preference) of the most recently updated preferences."""
+        query = (
+            self.db.collection(self.preferences_collection)
+            .order_by("updated_at", direction=firestore.Query.DESCENDING)
+            .limit(limit)
+        )
+        return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+    def prime_preference_cache(self, preferences: list[tuple[str, Dict[str, Any]]]) -> int:
+        """Put preferences from ``recent_preferences`` into the cache."""
+        for device_id, preference in preferences:
+            self._preference_cache.put(device_id, preference)
+        return len(preferences)
+
     def get_preference_by_device(self, device_id: str) -> Optional[Dict[str, Any]]:
-        # preference documents may not use device_id as document id; query by field
-        query = self.db.collection(self.preferences_collection).where("device_id", "==", device_id).limit(1)
-        docs = list(query.stream())
-        if docs:
-            return docs[0].to_dict()
-        return None
+        # Preference documents are keyed by device id (see app.jobs.migrate_preferences)
+        preference = self._preference_cache.get(device_id)
+        if preference is MISSING:
+            preference = self.get_preference(device_id)
+            self._preference_cache.put(device_id, preference)
+        return preference
+
 
+# Cache hits and fills are not backend calls; the get_preference a miss falls back to is
+instrument_methods(
+    FirestoreService,
+    "firestore",
+    skip=("get_preference_by_device", "peek_preference", "prime_preference_cache"),
+)
 
 _firestore_service = None
 
@@ -0,0 +1,234 @@
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Any, Dict, Iterable, Optional
+import asyncio
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.models.event import Event
+from app.services.catalog import get_catalog
+from app.services.firestore import get_firestore
+from app.services.metrics import live_connections, live_deltas, live_polls
+from app.services.serialization import project
+from app.services.snapshot import category_key
+
+logger = getLogger("uvicorn")
+
+# Attendance count aggregations in flight at once during a poll
+MAX_COUNTS_IN_FLIGHT = 16
+
+
+def remaining_seats(event: Optional[Dict[str, Any]], count: int) -> Optional[int]:
+    if not event or event.get("max_attendance") is None:
+        return None
+    return max(event["max_attendance"] - count, 0)
+
+
+def _delta(event_id: str, event: Optional[Dict[str, Any]], count: int, changed: bool) -> Dict[str, Any]:
+    delta = {
+        "event_id": event_id,
+        "active": bool(event and event.get("active", True)),
+        "remaining_seats": remaining_seats(event, count),
+    }
+    if changed and event:
+        delta["event"] = project(Event, event)
+    return delta
+
+
+class Subscription:
+    """One client's subscribed event ids / categories and its pending deltas.
+
+    Deltas are coalesced per event id until the client takes them, at most
+    once every ``min_interval`` seconds: a busy event costs one message
+    per interval however often it changes.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.event_ids: set[str] = set()
+        self.categories: set[str] = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+        self._sent_at = -float("inf")
+
+    def offer(self, delta: Dict[str, Any]) -> None:
+        event_id = delta["event_id"]
+        # A later seat count must not drop the event body of an earlier update
+        self._pending[event_id] = {**self._pending.get(event_id, {}), **delta}
+        self._ready.set()
+
+    async def next_batch(self) -> list[Dict[str, Any]]:
+        await self._ready.wait()
+        wait = self._sent_at + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        batch = list(self._pending.values())
+        self._pending = {}
+        self._ready.clear()
+        self._sent_at = time.monotonic()
+        return batch
+
+
+class LiveHub:
+    """Fans event changes out to the subscribed clients of this process.
+
+    One poll loop per process is the change listener, however many
+    clients are connected: every ``poll_seconds``, while anyone is
+    subscribed, it reads the events written, attendances created and
+    attendance deletions logged since its last cursors (three queries),
+    recounts attendances for the changed events that someone watches (one
+    count() aggregation each, ``MAX_COUNTS_IN_FLIGHT`` at a time, so no
+    attendance documents are read) and offers each subscriber a delta.
+    Idle connections cost a ``Subscription`` and no Firestore reads.
+    """
+
+    def __init__(self, poll_seconds: float, min_interval: float, max_connections: int, max_subscriptions: int):
+        self.poll_seconds = poll_seconds
+        self.min_interval = min_interval
+        self.max_connections = max_connections
+        self.max_subscriptions = max_subscriptions
+        self._subscriptions: set[Subscription] = set()
+        self._by_event: Dict[str, set[Subscription]] = {}
+        self._by_category: Dict[str, set[Subscription]] = {}
+        # Server times of the newest event / attendance / deletion write seen
+        self._events_since: Optional[datetime] = None
+        self._attendances_since: Optional[datetime] = None
+        self._deletions_since: Optional[datetime] = None
+
+    def connect(self) -> Optional[Subscription]:
+        """A new subscription; None when this worker is at ``max_connections``."""
+        if len(self._subscriptions) >= self.max_connections:
+            return None
+        subscription = Subscription(self.min_interval)
+        self._subscriptions.add(subscription)
+        live_connections.set(len(self._subscriptions))
+        return subscription
+
+    def disconnect(self, subscription: Subscription) -> None:
+        self.unsubscribe(subscription, list(subscription.event_ids), list(subscription.categories))
+        self._subscriptions.discard(subscription)
+        live_connections.set(len(self._subscriptions))
+
+    def subscribe(self, subscription: Subscription, event_ids: Iterable[str], categories: Iterable[str]) -> None:
+        """Add to ``subscription`` and offer it the current state of the new event ids.
+
+        The current state comes from the event catalog, so it can lag other
+        workers' writes by up to ``CATALOG_TTL_SECONDS``.
+        """
+        new_ids = [event_id for event_id in event_ids if event_id not in subscription.event_ids]
+        keys = {category_key(category) for category in categories} - {None}
+        if len(subscription.event_ids) + len(new_ids) + len(subscription.categories | keys) > self.max_subscriptions:
+            raise ValueError(f"At most {self.max_subscriptions} event ids and categories per connection")
+        for key in keys:
+            subscription.categories.add(key)
+            self._by_category.setdefault(key, set()).add(subscription)
+
+        catalog = get_catalog()
+        for event_id in new_ids:
+            subscription.event_ids.add(event_id)
+            self._by_event.setdefault(event_id, set()).add(subscription)
+            event = catalog.get(event_id)
+            if event is not None:
+                subscription.offer(_delta(event_id, event, catalog.count(event_id), changed=False))
+
+    def unsubscribe(self, subscription: Subscription, event_ids: Iterable[str], categories: Iterable[str]) -> None:
+        for index, keys, owned in (
+            (self._by_event, event_ids, subscription.event_ids),
+            (self._by_category, (category_key(category) for category in categories), subscription.categories),
+        ):
+            for key in keys:
+                owned.discard(key)
+                subscribers = index.get(key)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del index[key]
+
+    def _recipients(self, event_id: str, event: Optional[Dict[str, Any]]) -> set[Subscription]:
+        recipients = set(self._by_event.get(event_id, ()))
+        key = category_key(event.get("category")) if event else None
+        if key is not None:
+            recipients |= self._by_category.get(key, set())
+        return recipients
+
+    def _read_changes(self) -> tuple[list[Dict[str, Any]], set[str]]:
+        # Runs in a worker thread: Firestore calls block
+        firestore = get_firestore()
+        changed = firestore.list_events_changed_since(self._events_since)
+        for event in changed:
+            if event.get("updated_at") is not None:
+                self._events_since = max(self._events_since, event["updated_at"])
+        attended = set()
+        for attendance in firestore.stream_attendances(since=self._attendances_since):
+            attended.add(attendance["event_id"])
+            self._attendances_since = max(self._attendances_since, attendance["timestamp"])
+        for deletion in firestore.stream_attendance_deletions(since=self._deletions_since):
+            attended.add(deletion["event_id"])
+            self._deletions_since = max(self._deletions_since, deletion["deleted_at"])
+        return changed, attended
+
+    async def poll(self) -> None:
+        if not (self._by_event or self._by_category):
+            # Nobody to tell: start from the current time once someone subscribes
+            self._events_since = self._attendances_since = self._deletions_since = None
+            return
+        if self._events_since is None:
+            self._events_since = self._attendances_since = self._deletions_since = datetime.now(timezone.utc)
+            return
+
+        changed, attended = await run_in_threadpool(self._read_changes)
+        live_polls.inc()
+        catalog = get_catalog()
+        updates: Dict[str, tuple[Optional[Dict[str, Any]], bool]] = {
+            event_id: (catalog.peek(event_id), False) for event_id in attended
+        }
+        for event in changed:
+            updates[event["id"]] = (event, True)
+
+        targets = {}
+        for event_id, (event, doc_changed) in updates.items():
+            recipients = self._recipients(event_id, event)
+            if recipients:
+                targets[event_id] = (event, doc_changed, recipients)
+        if not targets:
+            return
+
+        firestore = get_firestore()
+        in_flight = asyncio.Semaphore(MAX_COUNTS_IN_FLIGHT)
+
+        async def count(event_id: str) -> int:
+            async with in_flight:
+                return await run_in_threadpool(firestore.count_attendances_for_event, event_id)
+
+        counts = await asyncio.gather(*(count(event_id) for event_id in targets))
+        for (event_id, (event, doc_changed, recipients)), seats_taken in zip(targets.items(), counts):
+            delta = _delta(event_id, event, seats_taken, doc_changed)
+            for subscription in recipients:
+                subscription.offer(delta)
+            live_deltas.inc(amount=len(recipients))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Live update poll failed")
+
+
+_live_hub = None
+
+
+def get_live_hub() -> LiveHub:
+    global _live_hub
+    if _live_hub is None:
+        _live_hub = LiveHub(
+            settings.live_poll_seconds,
+            settings.live_min_interval_seconds,
+            settings.live_max_connections,
+            settings.live_max_subscriptions,
+        )
+    return _live_hub
@@ -0,0 +1,287 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.services.geo import extract_lat_lon
+from app.services.snapshot import CatalogSnapshot
+
+# Finest grid level; a cell there is 360 / 2**24 degrees (~2 m) wide
+MAX_LEVEL = 24
+
+# Grid level shown at a map zoom level: a zoom-z map tile (256 px) holds
+# 2**LEVEL_OFFSET x 2**LEVEL_OFFSET cells, i.e. ~64 px clusters
+LEVEL_OFFSET = 2
+
+# Response bounds: at most this many clusters (the level is coarsened
+# until they fit) or individual events
+MAX_CLUSTERS = 256
+MAX_EVENTS = 200
+
+# From this zoom on, individual events are returned when they fit in MAX_EVENTS
+EVENTS_ZOOM = 15
+
+# Categories are free text: only the most frequent ones get a prefix-sum
+# column, the rest are counted from the list of their events
+DENSE_CATEGORIES = 32
+
+# Box lookups for individual events scan the cells of the finest level at
+# which the box spans at most this many
+MAX_SCAN_CELLS = 64
+
+
+def _spread(v: np.ndarray) -> np.ndarray:
+    # Insert a zero bit between each of the low 32 bits of v
+    v = v.astype(np.uint64)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def morton(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return _spread(x) | (_spread(y) << np.uint64(1))
+
+
+def grid_xy(lat, lon, level: int = MAX_LEVEL):
+    """Cell column / row of points at ``level``; lat/lon are clamped to the grid."""
+    cells = 1 << level
+    x = np.clip(np.floor((np.asarray(lon, dtype=np.float64) + 180) / 360 * cells), 0, cells - 1)
+    y = np.clip(np.floor((np.asarray(lat, dtype=np.float64) + 90) / 180 * cells), 0, cells - 1)
+    return x.astype(np.int64), y.astype(np.int64)
+
+
+def cell_bounds(x: int, y: int, level: int) -> list[float]:
+    """``[south, west, north, east]`` of a cell."""
+    width, height = 360 / (1 << level), 180 / (1 << level)
+    return [y * height - 90, x * width - 180, (y + 1) * height - 90, (x + 1) * width - 180]
+
+
+def _summary(doc: Dict[str, Any], lat: float, lon: float) -> Dict[str, Any]:
+    return {
+        "id": doc["id"],
+        "name": doc.get("name"),
+        "category": doc.get("category"),
+        "lat": lat,
+        "lng": lon,
+        "start_date": doc.get("start_date"),
+    }
+
+
+class MapGrid:
+    """Hierarchical grid aggregation of event coordinates for map views.
+
+    Snapshot events with coordinates are sorted by the Morton (Z-order)
+    code of their level-``MAX_LEVEL`` cell, like a geohash: every cell of
+    every coarser level is then one contiguous range of that order, and
+    its count, centroid and per-category counts come from prefix sums in
+    two binary searches, however many events it holds. Only the
+    ``DENSE_CATEGORIES`` most frequent categories have prefix sums; events
+    of the others are kept as a sorted list of positions in that order
+    and counted one by one. Events changed since the snapshot live in a
+    small overlay that ``EventCatalog`` keeps in step with its own; the
+    snapshot rows they replace are subtracted per query.
+    """
+
+    def __init__(self, base: CatalogSnapshot):
+        self.base = base
+        arrays = base.arrays
+        lat = np.asarray(arrays.lat, dtype=np.float64)
+        lon = np.asarray(arrays.lon, dtype=np.float64)
+        rows = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        x, y = grid_xy(lat[rows], lon[rows])
+        codes = morton(x, y)
+        order = np.argsort(codes, kind="stable")
+        self.rows = rows[order]
+        self.codes = codes[order]
+        self.lat = lat[self.rows]
+        self.lon = lon[self.rows]
+        self.categories = list(arrays.categories)
+        self._category_index = {category: code for code, category in enumerate(self.categories)}
+
+        # Prefix sums along the Morton order, with a leading zero row
+        self._sum_lat = np.concatenate(([0.0], np.cumsum(self.lat)))
+        self._sum_lon = np.concatenate(([0.0], np.cumsum(self.lon)))
+        codes_by_row = np.asarray(arrays.category_codes)[self.rows]
+        has_category = codes_by_row >= 0
+        frequency = np.bincount(codes_by_row[has_category], minlength=len(self.categories))
+        dense = np.argsort(-frequency, kind="stable")[:DENSE_CATEGORIES]
+        dense = dense[frequency[dense] > 0]
+        self._dense_names = [self.categories[code] for code in dense.tolist()]
+        column_of = np.full(len(self.categories), -1, dtype=np.int64)
+        column_of[dense] = np.arange(len(dense))
+        columns = np.where(has_category, column_of[np.maximum(codes_by_row, 0)], -1)
+        one_hot = np.zeros((len(self.rows), len(dense)), dtype=np.int32)
+        in_dense = np.flatnonzero(columns >= 0)
+        one_hot[in_dense, columns[in_dense]] = 1
+        self._sum_categories = np.concatenate(
+            (np.zeros((1, len(dense)), dtype=np.int32), np.cumsum(one_hot, axis=0, dtype=np.int32))
+        )
+        # Positions in the Morton order of events in the other categories
+        sparse = has_category & (columns < 0)
+        self._sparse_positions = np.flatnonzero(sparse)
+        self._sparse_codes = codes_by_row[sparse]
+
+        # event id -> (lat, lon, category, summary)
+        self._overlay: Dict[str, tuple[float, float, Optional[str], Dict[str, Any]]] = {}
+
+    def put(self, event: Dict[str, Any]) -> None:
+        self.discard(event["id"])
+        coords = extract_lat_lon(event.get("coordinates"))
+        if coords is not None:
+            self._overlay[event["id"]] = (coords[0], coords[1], event.get("category"), _summary(event, *coords))
+
+    def discard(self, event_id: str) -> None:
+        self._overlay.pop(event_id, None)
+
+    def clear_overlay(self) -> None:
+        self._overlay = {}
+
+    def view(
+        self, south: float, west: float, north: float, east: float, zoom: int, shadowed: np.ndarray
+    ) -> Dict[str, Any]:
+        """Clusters, or individual events, inside the bounding box at ``zoom``.
+
+        Clusters are whole grid cells, so edge cells may count events just
+        outside the box; individual events are strictly inside it.
+        """
+        level = min(zoom + LEVEL_OFFSET, MAX_LEVEL)
+        removed = np.flatnonzero(shadowed)
+        overlay = [
+            entry for entry in self._overlay.values()
+            if south <= entry[0] <= north and west <= entry[1] <= east
+        ]
+
+        if zoom >= EVENTS_ZOOM:
+            events = self._events_in(south, west, north, east, shadowed, overlay)
+            if events is not None:
+                return {"level": MAX_LEVEL, "clusters": [], "events": events}
+
+        while True:
+            clusters = self._clusters(south, west, north, east, level, removed, overlay)
+            if clusters is not None or level == 0:
+                return {"level": level, "clusters": clusters or [], "events": []}
+            level -= 1
+
+    def _cells(self, south: float, west: float, north: float, east: float, level: int):
+        (x0, x1), (y0, y1) = grid_xy([south, north], [west, east], level)
+        return x0, x1, y0, y1
+
+    def _clusters(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        level: int,
+        removed: np.ndarray,
+        overlay: list,
+    ) -> Optional[list[Dict[str, Any]]]:
+        # None when the box holds more than MAX_CLUSTERS non-empty cells
+        x0, x1, y0, y1 = self._cells(south, west, north, east, level)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > 16 * MAX_CLUSTERS:
+            return None
+        xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+        xs, ys = xs.ravel(), ys.ravel()
+        shift = np.uint64(2 * (MAX_LEVEL - level))
+        first = morton(xs, ys) << shift
+        lo = np.searchsorted(self.codes, first, side="left")
+        hi = np.searchsorted(self.codes, first + (np.uint64(1) << shift), side="left")
+
+        nonempty = np.flatnonzero(hi > lo)
+        # Removed rows can empty at most that many cells
+        if len(nonempty) > MAX_CLUSTERS + len(removed):
+            return None
+
+        a, b = lo[nonempty], hi[nonempty]
+        counts = (b - a).tolist()
+        lat_sums = (self._sum_lat[b] - self._sum_lat[a]).tolist()
+        lon_sums = (self._sum_lon[b] - self._sum_lon[a]).tolist()
+        dense_counts = (self._sum_categories[b] - self._sum_categories[a]).tolist()
+        sparse_lo = np.searchsorted(self._sparse_positions, a).tolist()
+        sparse_hi = np.searchsorted(self._sparse_positions, b).tolist()
+        # cell -> [count, lat sum, lon sum, category counts]
+        cells: Dict[tuple[int, int], list] = {}
+        for x, y, count, lat_sum, lon_sum, by_column, i, j in zip(
+            xs[nonempty].tolist(), ys[nonempty].tolist(), counts, lat_sums, lon_sums, dense_counts, sparse_lo, sparse_hi
+        ):
+            categories = {self._dense_names[c]: n for c, n in enumerate(by_column) if n}
+            for code in self._sparse_codes[i:j].tolist():
+                name = self.categories[code]
+                categories[name] = categories.get(name, 0) + 1
+            cells[(x, y)] = [count, lat_sum, lon_sum, categories]
+
+        # Removed snapshot rows count -1, overlay events +1
+        lat = np.asarray(self.base.arrays.lat)[removed]
+        lon = np.asarray(self.base.arrays.lon)[removed]
+        has_coords = ~(np.isnan(lat) | np.isnan(lon))
+        codes = np.asarray(self.base.arrays.category_codes)[removed][has_coords]
+        adj_lat = np.concatenate((lat[has_coords], [entry[0] for entry in overlay]))
+        adj_lon = np.concatenate((lon[has_coords], [entry[1] for entry in overlay]))
+        adj_categories = [self.categories[code] if code >= 0 else None for code in codes.tolist()]
+        adj_categories.extend(entry[2] for entry in overlay)
+        signs = [-1] * len(codes) + [1] * len(overlay)
+        xs, ys = grid_xy(adj_lat, adj_lon, level)
+        for x, y, a_lat, a_lon, category, sign in zip(
+            xs.tolist(), ys.tolist(), adj_lat.tolist(), adj_lon.tolist(), adj_categories, signs
+        ):
+            if not (x0 <= x <= x1 and y0 <= y <= y1):
+                continue
+            cell = cells.setdefault((x, y), [0, 0.0, 0.0, {}])
+            cell[0] += sign
+            cell[1] += sign * a_lat
+            cell[2] += sign * a_lon
+            if category:
+                cell[3][category] = cell[3].get(category, 0) + sign
+
+        clusters = []
+        for (x, y), (count, lat_sum, lon_sum, categories) in sorted(cells.items()):
+            if count <= 0:
+                continue
+            clusters.append({
+                "lat": lat_sum / count,
+                "lng": lon_sum / count,
+                "count": count,
+                "categories": {name: n for name, n in sorted(categories.items()) if n > 0},
+                "bounds": cell_bounds(x, y, level),
+            })
+            if len(clusters) > MAX_CLUSTERS:
+                return None
+        return clusters
+
+    def _events_in(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        shadowed: np.ndarray,
+        overlay: list,
+    ) -> Optional[list[Dict[str, Any]]]:
+        # None when more than MAX_EVENTS are in the box
+        # The codes between the box's corners can span most of the grid (a
+        # box across the equator or the prime meridian), so scan the cells
+        # covering it instead, each one contiguous range of the order
+        x0, x1, y0, y1 = self._cells(south, west, north, east, MAX_LEVEL)
+        shift = 0
+        while ((x1 >> shift) - (x0 >> shift) + 1) * ((y1 >> shift) - (y0 >> shift) + 1) > MAX_SCAN_CELLS:
+            shift += 1
+        xs, ys = np.meshgrid(np.arange(x0 >> shift, (x1 >> shift) + 1), np.arange(y0 >> shift, (y1 >> shift) + 1))
+        first = morton(xs.ravel(), ys.ravel()) << np.uint64(2 * shift)
+        lo = np.searchsorted(self.codes, first, side="left")
+        hi = np.searchsorted(self.codes, first + (np.uint64(1) << np.uint64(2 * shift)), side="left")
+        positions = np.concatenate([np.arange(a, b, dtype=np.int64) for a, b in zip(lo.tolist(), hi.tolist())])
+
+        lat, lon = self.lat[positions], self.lon[positions]
+        inside = np.flatnonzero((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east))
+        rows = self.rows[positions[inside]]
+        keep = ~shadowed[rows]
+        if int(keep.sum()) + len(overlay) > MAX_EVENTS:
+            return None
+
+        events = []
+        for row, r_lat, r_lon in zip(rows[keep], lat[inside][keep], lon[inside][keep]):
+            events.append(_summary(self.base.doc(int(row)), float(r_lat), float(r_lon)))
+        events.extend(summary for _, _, _, summary in overlay)
+        return sorted(events, key=lambda ev: ev["id"])
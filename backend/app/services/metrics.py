@@ -0,0 +1,284 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+import functools
+import inspect
+import threading
+import time
+
+from app.services.profiling import record_span
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Backend calls made while serving one request
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Route label for requests that match no route, to bound label cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {value:g}" for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str) -> None:
+        self.inc(*labels, amount=-1)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = self._header()
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _format_labels(self.label_names, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+http_requests = Counter("http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("method",))
+http_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent.", ("method", "route")
+)
+http_backend_calls = Histogram(
+    "http_request_backend_calls",
+    "Backend calls (Firestore, OpenAI, Speech, ffmpeg) made while serving one request.",
+    ("method", "route"),
+    buckets=CALL_COUNT_BUCKETS,
+)
+backend_calls = Counter("backend_calls_total", "Calls to backends by operation.", ("backend", "operation", "outcome"))
+backend_duration = Histogram(
+    "backend_call_duration_seconds", "Backend call latency by operation.", ("backend", "operation")
+)
+admission_queue_wait = Histogram(
+    "admission_queue_wait_seconds", "Time admitted requests waited for a slot in their pool.", ("pool",)
+)
+admission_shed = Counter(
+    "admission_shed_total", "Requests rejected by admission control.", ("pool", "reason")
+)
+admission_in_use = Gauge("admission_in_use", "Admission pool slots in use.", ("pool",))
+admission_queued = Gauge("admission_queued", "Requests waiting for an admission pool slot.", ("pool",))
+live_connections = Gauge("live_connections", "Open live update connections.")
+live_deltas = Counter("live_deltas_total", "Event deltas offered to live update subscribers.")
+live_polls = Counter("live_polls_total", "Change polls run by the live update listener.")
+
+REGISTRY = (
+    http_requests,
+    http_in_flight,
+    http_duration,
+    http_backend_calls,
+    backend_calls,
+    backend_duration,
+    admission_queue_wait,
+    admission_shed,
+    admission_in_use,
+    admission_queued,
+    live_connections,
+    live_deltas,
+    live_polls,
+)
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _RequestCalls:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+# Backend call tally of the request being served, if any
+_request_calls: ContextVar[Optional[_RequestCalls]] = ContextVar("request_calls", default=None)
+# Set while inside an instrumented call so nested ones are not counted twice
+_in_backend_call: ContextVar[bool] = ContextVar("in_backend_call", default=False)
+
+
+def _count_call() -> None:
+    calls = _request_calls.get()
+    if calls is not None:
+        calls.count += 1
+
+
+def _record(backend: str, operation: str, started: float, outcome: str) -> None:
+    ended = time.perf_counter()
+    backend_duration.observe(ended - started, backend, operation)
+    backend_calls.inc(backend, operation, outcome)
+    record_span(f"{backend}.{operation}", started, ended)
+
+
+@contextmanager
+def observe_backend(backend: str, operation: str) -> Iterator[None]:
+    """Time one backend call and count it against the current request."""
+    if _in_backend_call.get():
+        yield
+        return
+    token = _in_backend_call.set(True)
+    _count_call()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        _in_backend_call.reset(token)
+        _record(backend, operation, started, outcome)
+
+
+def _instrument(fn, backend: str):
+    operation = fn.__name__
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream(*args, **kwargs):
+            # Streaming responses may advance the generator from different
+            # threads, so no context variables are set across yields. Timed
+            # until exhausted, including the consumer's work between items.
+            _count_call()
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                yield from fn(*args, **kwargs)
+                outcome = "ok"
+            except GeneratorExit:
+                # Consumer stopped early, e.g. a client disconnect
+                outcome = "ok"
+                raise
+            finally:
+                _record(backend, operation, started, outcome)
+        return stream
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        with observe_backend(backend, operation):
+            return fn(*args, **kwargs)
+    return call
+
+
+def instrument_methods(cls, backend: str, skip: tuple[str, ...] = ()):
+    """Wrap every public method of ``cls`` except ``skip`` with ``observe_backend``."""
+    for name, fn in list(vars(cls).items()):
+        if not name.startswith("_") and name not in skip and inspect.isfunction(fn):
+            setattr(cls, name, _instrument(fn, backend))
+    return cls
+
+
+def _route_of(scope: Dict[str, Any]) -> str:
+    # Set by the router once a route matched; its template, not the raw
+    # path, so ids do not blow up label cardinality
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Request counts, latency and backend calls per route, plus in-flight.
+
+    The route is only known once routing has run, so the in-flight gauge
+    is labelled by method alone.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        calls = _RequestCalls()
+        token = _request_calls.set(calls)
+        http_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = _route_of(scope)
+            http_duration.observe(time.perf_counter() - started, method, route)
+            http_in_flight.dec(method)
+            http_requests.inc(method, route, status)
+            http_backend_calls.observe(calls.count, method, route)
+            _request_calls.reset(token)
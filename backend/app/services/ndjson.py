@@ -0,0 +1,123 @@
+from typing import Any, AsyncIterator
+import json
+import re
+
+_decoder = json.JSONDecoder()
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yield one decoded value per non-blank line, or the line's error."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode_line(line)
+    if buffer.strip():
+        yield _decode_line(buffer)
+
+
+def _decode_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return StreamFormatError(f"Invalid JSON: {e}")
+
+
+# What an element cut off by the end of the buffer can end with: part of a
+# number or of a literal
+_NUMBER_PREFIX = re.compile(r"-?[0-9]*(\.[0-9]*)?([eE][+-]?[0-9]*)?")
+_HEX_PREFIX = re.compile(r"u[0-9a-fA-F]{0,4}")
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+
+def _incomplete(buffer: str, error: json.JSONDecodeError) -> bool:
+    # Whether raw_decode failed only because the element continues past the buffer
+    if error.msg.startswith("Unterminated string"):
+        return True
+    if error.msg.startswith("Invalid \\uXXXX") and _HEX_PREFIX.fullmatch(buffer, error.pos):
+        return True
+    rest = buffer[error.pos:]
+    return (
+        not rest.strip()
+        or _NUMBER_PREFIX.fullmatch(rest) is not None
+        or any(literal.startswith(rest) for literal in _LITERALS)
+    )
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yield the elements of a top-level JSON array as they arrive.
+
+    Only the current, not yet complete element is buffered. Raises
+    StreamFormatError as soon as the body is not a well-formed array.
+    """
+    buffer = ""
+    pending = b""
+    # "start": before "[", "first": value or "]", "value": value after ",",
+    # "next": "," or "]", "done": after "]"
+    state = "start"
+    async for chunk in chunks:
+        # Keep incomplete UTF-8 sequences for the next chunk
+        pending += chunk
+        try:
+            buffer += pending.decode("utf-8")
+            pending = b""
+        except UnicodeDecodeError as e:
+            if e.start < len(pending) - 3:
+                raise StreamFormatError("Body is not valid UTF-8")
+            buffer += pending[:e.start].decode("utf-8")
+            pending = pending[e.start:]
+
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if state == "done":
+                raise StreamFormatError("Unexpected data after the JSON array")
+            if state == "start":
+                if char != "[":
+                    raise StreamFormatError("Expected a JSON array")
+                state = "first"
+                pos += 1
+                continue
+            if state == "next":
+                if char == "]":
+                    state = "done"
+                elif char == ",":
+                    state = "value"
+                else:
+                    raise StreamFormatError("Expected ',' between array elements")
+                pos += 1
+                continue
+            if char == "]":
+                if state == "value":
+                    raise StreamFormatError("Trailing comma in JSON array")
+                state = "done"
+                pos += 1
+                continue
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if _incomplete(buffer, e):
+                    break
+                raise StreamFormatError(f"Invalid JSON: {e.msg}")
+            if not isinstance(value, (dict, list, str)) and _NUMBER_PREFIX.fullmatch(buffer, end):
+                # A number or literal may continue in the next chunk
+                break
+            yield value
+            pos = end
+            state = "next"
+        buffer = buffer[pos:]
+
+    if pending:
+        raise StreamFormatError("Body is not valid UTF-8")
+    if state != "done":
+        raise StreamFormatError("Unexpected end of JSON array" if state != "start" else "Expected a JSON array")
@@ -0,0 +1,13 @@
+from app.config import settings
+
+_openai_client = None
+
+
+def get_openai():
+    # openai is heavy to import; only the AI helper routes pay for it, once
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+
+        _openai_client = OpenAI(api_key=settings.openai_api_key)
+    return _openai_client
@@ -0,0 +1,252 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+import functools
+import hmac
+import inspect
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+from app.config import settings
+
+# Request header that turns profiling on; its value must match settings.profile_token
+PROFILE_HEADER = b"x-profile"
+
+
+class RequestProfile:
+    """Spans and stack samples collected while serving one request.
+
+    Spans are ``(name, start, end)`` in ``perf_counter`` seconds. Samples
+    are collapsed stacks (root first, ``;``-separated) of the thread that
+    runs the event loop, taken every ``interval`` seconds by a background
+    thread; the counts are in the folded format flamegraph.pl and
+    speedscope read.
+
+    That thread is shared by every request in flight, so samples show
+    whatever the loop was running, including other requests' handlers:
+    a profile is only clean when its request ran alone. Spans are per
+    request.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.endpoint_started: Optional[float] = None
+        self.endpoint_ended: Optional[float] = None
+        self.response_started: Optional[float] = None
+        self.ended: Optional[float] = None
+        self.spans: list[tuple[str, float, float]] = []
+        self.samples: Counter = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+        self._sampler.start()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self.ended = time.perf_counter()
+        self._stop.set()
+        self._sampler.join()
+
+    def phase_spans(self) -> list[tuple[str, float, float]]:
+        """Validation / endpoint / serialization split around the endpoint call."""
+        response_started = self.response_started or self.ended or time.perf_counter()
+        if self.endpoint_started is None:
+            # Rejected before the endpoint ran, e.g. a 422
+            return [("validation", self.started, response_started)]
+        endpoint_ended = self.endpoint_ended or response_started
+        return [
+            ("validation", self.started, self.endpoint_started),
+            ("endpoint", self.endpoint_started, endpoint_ended),
+            ("serialization", endpoint_ended, response_started),
+        ]
+
+    def all_spans(self) -> list[tuple[str, float, float]]:
+        return sorted(self.phase_spans() + self.spans, key=lambda s: s[1])
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            f"{name.replace(' ', '_')};dur={(end - start) * 1e3:.1f}" for name, start, end in self.all_spans()
+        )
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.ended or time.perf_counter()) - self.started) * 1e3
+
+    def save(self, directory: str, method: str, route: str, status: int) -> str:
+        """Write ``<name>.folded`` (stack samples) and ``<name>.json`` (spans)."""
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{int(self.duration_ms)}ms-{method}-{slug}"
+        base = os.path.join(directory, name)
+        with open(base + ".folded", "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(base + ".json", "w") as f:
+            json.dump(
+                {
+                    "method": method,
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(self.duration_ms, 2),
+                    "interval_ms": self.interval * 1e3,
+                    "spans": [
+                        {"name": n, "start_ms": round((s - self.started) * 1e3, 2), "duration_ms": round((e - s) * 1e3, 2)}
+                        for n, s, e in self.all_spans()
+                    ],
+                },
+                f,
+                indent=2,
+            )
+        _prune(directory, settings.profile_max_files)
+        return base
+
+
+def _prune(directory: str, max_files: int) -> None:
+    # Two files per capture; drop the oldest captures beyond the cap
+    names = sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+    for old in names[:-max_files] if max_files > 0 else names:
+        for suffix in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(directory, old[: -len(".json")] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def record_span(name: str, start: float, end: float) -> None:
+    profile = _profile.get()
+    if profile is not None:
+        profile.spans.append((name, start, end))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block for the current request's profile; free when not profiling."""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.spans.append((name, start, time.perf_counter()))
+
+
+def _mark_endpoint(endpoint):
+    # FastAPI reads the signature through __wrapped__, so parameters and
+    # dependencies resolve exactly as for the bare endpoint
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            profile = _profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            profile.endpoint_started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.endpoint_ended = time.perf_counter()
+        return wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        profile = _profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.endpoint_started = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.endpoint_ended = time.perf_counter()
+    return sync_wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route that marks where its endpoint starts and ends.
+
+    That splits request validation and response serialization out of the
+    handler time in profiled requests.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs: Any):
+        super().__init__(path, _mark_endpoint(endpoint), **kwargs)
+
+
+def _requested(scope: Dict[str, Any]) -> bool:
+    if not settings.profile_token:
+        return False
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return hmac.compare_digest(value, settings.profile_token.encode())
+    return False
+
+
+class ProfilingMiddleware:
+    """Profile requests sent with a valid ``X-Profile`` header or sampled.
+
+    Header-triggered responses carry the span breakdown in a
+    ``Server-Timing`` header. Any profiled request slower than
+    ``settings.profile_slow_ms`` is saved to ``settings.profile_output_dir``.
+    Unprofiled requests only pay for the header scan and a random draw.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = _requested(scope)
+        sampled = settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+        if not (requested or sampled):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(settings.profile_interval_ms / 1e3)
+        token = _profile.set(profile)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                profile.response_started = time.perf_counter()
+                status = message["status"]
+                if requested:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", profile.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            profile.stop()
+            _profile.reset(token)
+            if profile.duration_ms >= settings.profile_slow_ms:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                # File writes and pruning block; keep them off the event loop
+                await run_in_threadpool(profile.save, settings.profile_output_dir, scope["method"], route, status)
@@ -0,0 +1,142 @@
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import time
+
+from app.config import settings
+from app.services.catalog import get_catalog
+from app.services.coattendance import get_coattendance
+from app.services.firestore import get_firestore
+
+# Seconds to wait for an upstream connection during warm-up
+UPSTREAM_TIMEOUT_SECONDS = 5
+
+
+def _warm_openai() -> None:
+    from app.services.openai_client import get_openai
+
+    # Any authenticated call opens the TLS connection the pool will reuse
+    get_openai().with_options(timeout=UPSTREAM_TIMEOUT_SECONDS).models.list()
+
+
+def _warm_speech() -> None:
+    import grpc
+
+    from app.services.speech import get_speech_client
+
+    channel = get_speech_client().transport.grpc_channel
+    grpc.channel_ready_future(channel).result(timeout=UPSTREAM_TIMEOUT_SECONDS)
+
+
+async def _warm_catalog() -> Dict[str, Any]:
+    return {"events": await get_catalog().warm_up()}
+
+
+async def _warm_search_index() -> Dict[str, Any]:
+    index = await get_catalog().wait_for_search_index()
+    if index is None:
+        raise RuntimeError("Search index build failed")
+    return {"terms": len(index.terms)}
+
+
+async def _prime_preferences() -> Dict[str, Any]:
+    firestore = get_firestore()
+    preferences = await asyncio.to_thread(firestore.recent_preferences, settings.warmup_preference_count)
+    return {"primed": firestore.prime_preference_cache(preferences)}
+
+
+class Readiness:
+    """Startup warm-up and the per-dependency results behind ``/ready``.
+
+    ``warm_up`` runs the required checks once in the background so
+    ``/health`` keeps answering meanwhile. Blocking checks run in a worker
+    thread; the catalog and caches that request handlers share are read
+    there but installed on the event loop, so handlers never see them half
+    built. The instance is ready as soon as the required checks have
+    passed. Optional ones (caches that can fill on demand, upstream APIs
+    only some routes use) then run in a task of their own and only add
+    their results to the report. A failed warm-up is retried when
+    ``/ready`` is next polled.
+    """
+
+    def __init__(self):
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self.warm_up_ms: Optional[float] = None
+        self._task: Optional[asyncio.Future] = None
+        self._optional_task: Optional[asyncio.Future] = None
+
+    async def _check(self, name: str, fn: Callable[[], Any], required: bool = True) -> None:
+        # ``fn`` is a coroutine function, or a blocking one run in a worker thread
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"required": required}
+        try:
+            detail = await fn() if asyncio.iscoroutinefunction(fn) else await asyncio.to_thread(fn)
+            result["ready"] = True
+            if detail is not None:
+                result["detail"] = detail
+        except Exception as e:
+            result["ready"] = False
+            result["error"] = str(e)
+        result["ms"] = round((time.perf_counter() - started) * 1e3, 1)
+        self.checks[name] = result
+
+    async def warm_up(self) -> None:
+        started = time.perf_counter()
+        self.checks = {}
+        self.warm_up_ms = None
+        await self._check("firestore", lambda: get_firestore().ping())
+        if not self.checks["firestore"]["ready"]:
+            # Everything below reads through the same channel
+            self.warm_up_ms = round((time.perf_counter() - started) * 1e3, 1)
+            return
+        await self._check("catalog", _warm_catalog)
+        self.warm_up_ms = round((time.perf_counter() - started) * 1e3, 1)
+        if self.checks["catalog"]["ready"]:
+            self._optional_task = asyncio.ensure_future(self._optional_checks())
+
+    async def _optional_checks(self) -> None:
+        await self._check("search_index", _warm_search_index, required=False)
+        await self._check("preference_cache", _prime_preferences, required=False)
+        await self._check("coattendance", lambda: {"loaded": get_coattendance() is not None}, required=False)
+        if settings.warmup_upstream_clients:
+            if settings.openai_api_key:
+                await self._check("openai", _warm_openai, required=False)
+            if settings.google_application_credentials:
+                await self._check("speech", _warm_speech, required=False)
+
+    def start(self) -> None:
+        """Run ``warm_up`` in the background unless it is already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.warm_up())
+
+    @property
+    def warming(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def ready(self) -> bool:
+        if self.warming or self.warm_up_ms is None:
+            return False
+        return all(check["ready"] for check in self.checks.values() if check["required"])
+
+    def report(self) -> Dict[str, Any]:
+        if self.warming:
+            status = "warming"
+        else:
+            status = "ready" if self.ready else "unavailable"
+        optional_warming = self._optional_task is not None and not self._optional_task.done()
+        return {
+            "status": status,
+            "warm_up_ms": self.warm_up_ms,
+            "optional_warming": optional_warming,
+            "checks": self.checks,
+        }
+
+
+_readiness = None
+
+
+def get_readiness() -> Readiness:
+    global _readiness
+    if _readiness is None:
+        _readiness = Readiness()
+    return _readiness
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import time
+
+from app.config import settings
+
+
+class RecommendationCache:
+    """Short-lived cache of ranked event ids per device and query.
+
+    Entries are keyed by ``(device_id, ...)`` tuples and hold event ids
+    only; callers hydrate them from the catalog so name/description edits
+    show up without invalidation. Writes that change a device's history or
+    preference drop that device's entries; capacity or coordinate changes
+    on any event drop everything, since any ranking may move.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple[float, list[str]]]" = OrderedDict()
+        self._by_device: Dict[str, set[tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+
+    def get(self, key: tuple) -> Optional[list[str]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._served_age_total += age
+                self._served_age_max = max(self._served_age_max, age)
+                return entry[1]
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, event_ids: list[str]) -> None:
+        self._drop(key)
+        self._entries[key] = (time.monotonic(), event_ids)
+        self._by_device.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: tuple) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        keys = self._by_device.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_device[key[0]]
+
+    def invalidate_device(self, device_id: Hashable) -> None:
+        keys = self._by_device.pop(device_id, ())
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += len(keys)
+
+    def invalidate_all(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._by_device.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "served_age_avg_seconds": self._served_age_total / self.hits if self.hits else 0.0,
+            "served_age_max_seconds": self._served_age_max,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+_recommendation_cache = None
+
+
+def get_recommendation_cache() -> RecommendationCache:
+    global _recommendation_cache
+    if _recommendation_cache is None:
+        _recommendation_cache = RecommendationCache(
+            settings.recommendation_cache_ttl_seconds,
+            settings.recommendation_cache_max_entries,
+        )
+    return _recommendation_cache
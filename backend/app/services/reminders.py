@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from typing import Any, Dict, Optional
+import importlib
+import math
+
+from app.services.firestore import get_firestore
+from app.services.snapshot import epoch_seconds
+from app.services.timing_wheel import TimingWheel
+
+logger = getLogger("uvicorn")
+
+
+class ReminderSender(ABC):
+    """Delivers reminders; subclass and name it in ``REMINDER_SENDER``."""
+
+    @abstractmethod
+    def send(self, reminders: list[Dict[str, Any]]) -> None:
+        """Deliver one batch of reminders."""
+
+
+class LogSender(ReminderSender):
+    """Local stand-in: logs each reminder instead of delivering it."""
+
+    def send(self, reminders: list[Dict[str, Any]]) -> None:
+        for reminder in reminders:
+            logger.info(
+                "Reminder for %s: %s (%s) starts at %s",
+                reminder["device_id"],
+                reminder["name"],
+                reminder["event_id"],
+                reminder["start_date"],
+            )
+
+
+def load_sender(path: str) -> ReminderSender:
+    """Instantiate a sender from ``"module:ClassName"``."""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+class ReminderScheduler:
+    """Sends each attendee a reminder ``lead`` before their event starts.
+
+    The timing wheel holds one timer per upcoming event rather than one
+    per attendance: moving an event reschedules all of its reminders in
+    O(1), and attendances created or deleted before the reminder is due
+    need no bookkeeping, since an event's attendees are read when its
+    timer fires. ``rebuild`` reloads the timers from Firestore after a
+    restart; ``poll_changes`` follows events updated since.
+
+    The ``reminders`` collection records the start date each event's
+    reminders went out for, so a restart does not resend them; moving the
+    event again arms a new reminder.
+    """
+
+    def __init__(self, sender: ReminderSender, lead: timedelta, batch_size: int, tick_seconds: float = 1):
+        self.sender = sender
+        self.lead_seconds = lead.total_seconds()
+        self.batch_size = batch_size
+        self.tick_seconds = tick_seconds
+        self.wheel = TimingWheel(self._tick(datetime.now(timezone.utc)))
+        # event id -> (name, start_date) of the events with a timer
+        self._events: Dict[str, tuple[Optional[str], datetime]] = {}
+        self._changed_since: Optional[datetime] = None
+        # event id -> start date its reminders were sent for
+        self._reminded: Dict[str, datetime] = {}
+
+    def _tick(self, value: datetime) -> int:
+        return math.floor(epoch_seconds(value, 0) / self.tick_seconds)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def schedule(self, event: Dict[str, Any], now: Optional[datetime] = None) -> None:
+        """(Re)arm, move or cancel ``event``'s reminder from its stored state."""
+        event_id = event["id"]
+        start = event.get("start_date")
+        now = now or datetime.now(timezone.utc)
+        if (
+            not event.get("active", True)
+            or start is None
+            or epoch_seconds(start, 0) <= epoch_seconds(now, 0)
+            or self._reminded.get(event_id) == start
+        ):
+            self.cancel(event_id)
+            return
+        # A reminder already due (the event moved closer, or a restart) goes out on the next tick
+        self.wheel.schedule(event_id, self._tick(start) - math.floor(self.lead_seconds / self.tick_seconds))
+        self._events[event_id] = (event.get("name"), start)
+
+    def cancel(self, event_id: str) -> None:
+        self.wheel.cancel(event_id)
+        self._events.pop(event_id, None)
+
+    def rebuild(self) -> int:
+        """Timers for every upcoming active event; returns how many."""
+        now = datetime.now(timezone.utc)
+        self._changed_since = now
+        firestore = get_firestore()
+        self._reminded = firestore.list_reminded(now)
+        for event in firestore.list_upcoming_events(now):
+            self.schedule(event, now)
+        return len(self)
+
+    def poll_changes(self) -> int:
+        """Apply events updated since the last poll; returns how many."""
+        changed = get_firestore().list_events_changed_since(self._changed_since)
+        for event in changed:
+            if event.get("updated_at") is not None:
+                self._changed_since = max(self._changed_since, event["updated_at"])
+            self.schedule(event)
+        return len(changed)
+
+    def dispatch(self, now: Optional[datetime] = None) -> int:
+        """Send the reminders due by ``now`` in batches; returns how many."""
+        firestore = get_firestore()
+        batch: list[Dict[str, Any]] = []
+        reminded: list[tuple[str, datetime]] = []
+        sent = 0
+        for event_id in self.wheel.advance(self._tick(now or datetime.now(timezone.utc))):
+            name, start = self._events.pop(event_id)
+            for device_id in firestore.list_attendee_devices(event_id):
+                batch.append({"device_id": device_id, "event_id": event_id, "name": name, "start_date": start})
+                if len(batch) >= self.batch_size:
+                    self.sender.send(batch)
+                    sent += len(batch)
+                    batch = []
+            reminded.append((event_id, start))
+        if batch:
+            self.sender.send(batch)
+            sent += len(batch)
+        # Recorded once sent: a crash in between resends rather than drops
+        for event_id, start in reminded:
+            firestore.mark_reminded(event_id, start)
+            self._reminded[event_id] = start
+        return sent
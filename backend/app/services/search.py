@@ -0,0 +1,278 @@
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+import heapq
+import math
+import os
+import re
+import unicodedata
+
+import numpy as np
+import orjson
+
+from app.services.geo import extract_lat_lon, haversine_km, haversine_km_array
+from app.services.snapshot import CatalogSnapshot
+from app.services.versioned import current_version_dir, new_version_dir, publish
+
+# BM25 term saturation and length normalisation (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A term in the name weighs as much as this many in the description
+NAME_WEIGHT = 3
+
+# The last query term also matches longer terms starting with it once it
+# is this long, expanded to at most this many of the most frequent ones
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 50
+
+# Postings columns saved as-is
+ARRAY_COLUMNS = ("offsets", "rows", "tf", "doc_len")
+
+META_FILE = "meta.json"
+
+_TOKEN = re.compile(r"\w+")
+# Unicode's combining diacritical mark blocks, left over once NFKD splits
+# accented letters into base letter + mark
+_COMBINING = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+
+def fold(text: str) -> str:
+    """Casefold and strip accents: ``"Kahvila Ähtäri"`` -> ``"kahvila ahtari"``."""
+    text = text.casefold()
+    if text.isascii():
+        return text
+    return _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    return _TOKEN.findall(fold(text)) if text else []
+
+
+def term_weights(event: Dict[str, Any]) -> Counter:
+    weights = Counter(tokenize(event.get("description")))
+    for term in tokenize(event.get("name")):
+        weights[term] += NAME_WEIGHT
+    return weights
+
+
+def _bm25(idf: float, tf, doc_len, avg_len: float):
+    return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len))
+
+
+class SearchIndex:
+    """BM25 over event names and descriptions, laid out like the catalog.
+
+    Postings of the snapshot's rows are flat arrays: ``terms`` is the
+    sorted vocabulary, so the completions of a prefix are one contiguous
+    range, and ``rows`` / ``tf`` hold each term's postings at
+    ``offsets[t]:offsets[t + 1]``. ``app.jobs.snapshot_catalog`` publishes
+    them next to the snapshot for workers to memory-map; without a
+    matching version a worker builds them itself. Events changed since
+    the snapshot live in a small dict overlay that ``EventCatalog`` keeps
+    in step with its own; the snapshot rows they replace are masked out
+    per query.
+
+    Document frequencies and the average length count every snapshot row,
+    shadowed or not, as an approximation until the next snapshot.
+    """
+
+    def __init__(
+        self,
+        base: CatalogSnapshot,
+        terms: list[str],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        tf: np.ndarray,
+        doc_len: np.ndarray,
+    ):
+        self.base = base
+        self.terms = terms
+        self._term_index = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.tf = tf
+        self.doc_len = doc_len
+        self._base_total_len = float(doc_len.sum())
+        self._overlay: Dict[str, Counter] = {}
+        self._overlay_len: Dict[str, int] = {}
+        self._overlay_coords: Dict[str, Optional[tuple[float, float]]] = {}
+        self._overlay_postings: Dict[str, set[str]] = {}
+
+    @classmethod
+    def build(cls, base: CatalogSnapshot) -> "SearchIndex":
+        vocabulary: Dict[str, int] = {}
+        term_ids: list[int] = []
+        rows: list[int] = []
+        tfs: list[int] = []
+        doc_len = np.zeros(len(base), dtype=np.float32)
+        for row in range(len(base)):
+            lo, hi = base.doc_offsets[row], base.doc_offsets[row + 1]
+            # Only the text fields are needed; skip the datetime decoding of doc()
+            weights = term_weights(orjson.loads(base.docs[lo:hi].tobytes()))
+            for term, weight in weights.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                tfs.append(weight)
+            doc_len[row] = sum(weights.values())
+
+        terms = sorted(vocabulary)
+        rank = np.empty(len(vocabulary), dtype=np.int64)
+        rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+        keys = rank[np.array(term_ids, dtype=np.int64)]
+        # Stable sort: each term's postings stay in row order
+        order = np.argsort(keys, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=len(terms)), out=offsets[1:])
+        return cls(
+            base,
+            terms,
+            offsets,
+            np.array(rows, dtype=np.int32)[order],
+            np.minimum(np.array(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+            doc_len,
+        )
+
+    def save(self, path: str) -> str:
+        """Write a new version under ``path``, tied to the base's snapshot time."""
+        version_dir = new_version_dir(path)
+        for column in ARRAY_COLUMNS:
+            np.save(os.path.join(version_dir, f"{column}.npy"), getattr(self, column))
+        meta = {"snapshot_time": self.base.snapshot_time.isoformat(), "rows": len(self.base), "terms": self.terms}
+        with open(os.path.join(version_dir, META_FILE), "wb") as f:
+            f.write(orjson.dumps(meta))
+        publish(path, version_dir)
+        return version_dir
+
+    @classmethod
+    def load(cls, path: str, base: CatalogSnapshot) -> Optional["SearchIndex"]:
+        """The published index for ``base``; None if there is none or it is for another snapshot."""
+        version_dir = current_version_dir(path)
+        if version_dir is None:
+            return None
+        with open(os.path.join(version_dir, META_FILE), "rb") as f:
+            meta = orjson.loads(f.read())
+        if meta["rows"] != len(base) or datetime.fromisoformat(meta["snapshot_time"]) != base.snapshot_time:
+            return None
+        columns = {
+            column: np.load(os.path.join(version_dir, f"{column}.npy"), mmap_mode="r") for column in ARRAY_COLUMNS
+        }
+        return cls(base, meta["terms"], **columns)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """Index ``event`` in the overlay, replacing any earlier version."""
+        event_id = event["id"]
+        self.discard(event_id)
+        weights = term_weights(event)
+        self._overlay[event_id] = weights
+        self._overlay_len[event_id] = sum(weights.values())
+        self._overlay_coords[event_id] = extract_lat_lon(event.get("coordinates"))
+        for term in weights:
+            self._overlay_postings.setdefault(term, set()).add(event_id)
+
+    def discard(self, event_id: str) -> None:
+        weights = self._overlay.pop(event_id, None)
+        if weights is None:
+            return
+        del self._overlay_len[event_id]
+        del self._overlay_coords[event_id]
+        for term in weights:
+            ids = self._overlay_postings[term]
+            ids.discard(event_id)
+            if not ids:
+                del self._overlay_postings[term]
+
+    def clear_overlay(self) -> None:
+        self._overlay = {}
+        self._overlay_len = {}
+        self._overlay_coords = {}
+        self._overlay_postings = {}
+
+    def _base_df(self, term: str) -> int:
+        t = self._term_index.get(term)
+        return 0 if t is None else int(self.offsets[t + 1] - self.offsets[t])
+
+    def _df(self, term: str) -> int:
+        return self._base_df(term) + len(self._overlay_postings.get(term, ()))
+
+    def _expand(self, prefix: str) -> list[str]:
+        lo = bisect_left(self.terms, prefix)
+        hi = bisect_left(self.terms, prefix + "\U0010ffff")
+        completions = set(self.terms[lo:hi])
+        completions.update(term for term in self._overlay_postings if term.startswith(prefix))
+        if len(completions) > MAX_PREFIX_EXPANSIONS:
+            completions = heapq.nlargest(MAX_PREFIX_EXPANSIONS, completions, key=self._df)
+        return list(completions)
+
+    def query_terms(self, query: str) -> list[str]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        terms = set(tokens)
+        if len(tokens[-1]) >= MIN_PREFIX_LENGTH:
+            terms.update(self._expand(tokens[-1]))
+        return sorted(terms)
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        shadowed: np.ndarray,
+        origin: Optional[tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+    ) -> list[tuple[str, float]]:
+        """Best ``limit`` (event id, score) pairs for ``query``, best first.
+
+        Snapshot rows set in ``shadowed`` are skipped; with ``origin`` and
+        ``radius_km`` only events within that distance are returned.
+        """
+        terms = self.query_terms(query)
+        if not terms:
+            return []
+        n_docs = len(self.base) + len(self._overlay)
+        avg_len = max((self._base_total_len + sum(self._overlay_len.values())) / max(n_docs, 1), 1.0)
+
+        scores = np.zeros(len(self.base), dtype=np.float32)
+        overlay_scores: Dict[str, float] = {}
+        for term in terms:
+            df = self._df(term)
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            t = self._term_index.get(term)
+            if t is not None:
+                lo, hi = self.offsets[t], self.offsets[t + 1]
+                rows = self.rows[lo:hi]
+                # A term's postings hold each row once, so plain fancy-index += is exact
+                scores[rows] += _bm25(idf, self.tf[lo:hi], self.doc_len[rows], avg_len)
+            for event_id in self._overlay_postings.get(term, ()):
+                tf = self._overlay[event_id][term]
+                overlay_scores[event_id] = overlay_scores.get(event_id, 0.0) + _bm25(
+                    idf, tf, self._overlay_len[event_id], avg_len
+                )
+
+        hits = np.flatnonzero(scores)
+        hits = hits[~shadowed[hits]]
+        if origin is not None and radius_km is not None and len(hits):
+            lats = np.asarray(self.base.arrays.lat)[hits]
+            lons = np.asarray(self.base.arrays.lon)[hits]
+            hits = hits[haversine_km_array(origin[0], origin[1], lats, lons) <= radius_km]
+        if len(hits) > limit:
+            # Every hit above the limit-th best score, then the lowest rows
+            # (rows are in id order) among those tied with it
+            hit_scores = scores[hits]
+            threshold = -np.partition(-hit_scores, limit - 1)[limit - 1]
+            above = hits[hit_scores > threshold]
+            tied = hits[hit_scores == threshold]
+            hits = np.concatenate([above, tied[:limit - len(above)]])
+        results = [(self.base.arrays.event_id(row), float(scores[row])) for row in hits]
+
+        for event_id, score in overlay_scores.items():
+            if origin is not None and radius_km is not None:
+                coords = self._overlay_coords[event_id]
+                if coords is None or haversine_km(origin[0], origin[1], coords[0], coords[1]) > radius_km:
+                    continue
+            results.append((event_id, score))
+        # Ties go to the lower id, so results are stable across calls
+        return sorted(results, key=lambda r: (-r[1], r[0]))[:limit]
@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Type
+import functools
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from app.config import settings
+
+# Datetimes as RFC 3339 with "Z", like Pydantic's own JSON output
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # orjson only handles datetime itself, not subclasses such as
+        # Firestore's DatetimeWithNanoseconds
+        return datetime(
+            value.year, value.month, value.day, value.hour, value.minute, value.second, value.microsecond, value.tzinfo
+        )
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@functools.cache
+def _field_names(model: Type[BaseModel]) -> tuple[str, ...]:
+    return tuple(model.model_fields)
+
+
+def project(model: Type[BaseModel], doc: Mapping[str, Any]) -> Dict[str, Any]:
+    """``doc`` cut down to the fields ``model`` would serialize."""
+    if settings.validate_responses:
+        return model.model_validate(doc).model_dump()
+    return {name: doc.get(name) for name in _field_names(model)}
+
+
+def render(
+    model: Type[BaseModel],
+    data: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> FastJSONResponse:
+    """Respond with stored documents (one or a list) shaped as ``model``.
+
+    Documents are validated once, on the way into Firestore, so they are
+    not rebuilt as models here and returning a Response skips FastAPI's
+    ``response_model`` pass; the route's ``response_model`` still documents
+    the schema. Set ``VALIDATE_RESPONSES`` to validate every response
+    against the model instead, e.g. while changing a model.
+    """
+    if isinstance(data, Mapping):
+        content = project(model, data)
+    else:
+        content = [project(model, doc) for doc in data]
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
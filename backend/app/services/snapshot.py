@@ -0,0 +1,224 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+import json
+import math
+import os
+
+import numpy as np
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+from app.services.scoring import CandidateArrays
+from app.services.versioned import current_version_dir, new_version_dir, publish
+
+META_FILE = "meta.json"
+
+# Document fields stored as RFC 3339 strings in the doc table
+DATETIME_FIELDS = ("start_date", "end_date", "timestamp", "updated_at")
+
+# Attendances and events this close to the snapshot time are left to the
+# catalog's delta reads, covering clock skew between the snapshot host and
+# Firestore
+DELTA_MARGIN_SECONDS = 60
+
+# CandidateArrays columns saved as-is
+ARRAY_COLUMNS = ("ids", "lat", "lon", "max_attendance", "count", "category_codes", "amenity_masks")
+
+
+def epoch_seconds(value: Optional[datetime], default: float) -> float:
+    if value is None:
+        return default
+    if value.tzinfo is None:
+        # Naive datetimes come from request bodies; Firestore stores UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def category_key(category: Optional[str]) -> Optional[str]:
+    return category.casefold() if category else None
+
+
+def _rfc3339(value: datetime) -> str:
+    if isinstance(value, DatetimeWithNanoseconds):
+        # Keeps nanoseconds so updated_at still matches Firestore's update time
+        return value.rfc3339()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _encode_doc(event: Dict[str, Any]) -> bytes:
+    doc = dict(event)
+    for field in DATETIME_FIELDS:
+        if isinstance(doc.get(field), datetime):
+            doc[field] = _rfc3339(doc[field])
+    return json.dumps(doc, separators=(",", ":"), default=str).encode()
+
+
+def _decode_doc(raw: bytes) -> Dict[str, Any]:
+    doc = json.loads(raw)
+    for field in DATETIME_FIELDS:
+        if isinstance(doc.get(field), str):
+            doc[field] = DatetimeWithNanoseconds.from_rfc3339(doc[field])
+    return doc
+
+
+class CatalogSnapshot:
+    """Columnar copy of the active events as of ``snapshot_time``.
+
+    Rows are sorted by event id. Alongside the scoring columns of
+    ``arrays`` it holds start/end epoch columns (+/-inf when unset), a
+    category index (row numbers grouped by casefolded category, with the
+    slice for each key in ``category_offsets``) and the full documents as
+    a JSON string table. Attendance counts are as of ``counted_through``,
+    ``DELTA_MARGIN_SECONDS`` before ``snapshot_time``. Loaded snapshots are memory-mapped read-only, so
+    every worker on a host shares the same pages.
+    """
+
+    def __init__(
+        self,
+        arrays: CandidateArrays,
+        start: np.ndarray,
+        end: np.ndarray,
+        category_order: np.ndarray,
+        category_offsets: Dict[str, tuple[int, int]],
+        doc_offsets: np.ndarray,
+        docs: np.ndarray,
+        snapshot_time: datetime,
+    ):
+        self.arrays = arrays
+        self.start = start
+        self.end = end
+        self.category_order = category_order
+        self.category_offsets = category_offsets
+        self.doc_offsets = doc_offsets
+        self.docs = docs
+        self.snapshot_time = snapshot_time
+
+    def __len__(self) -> int:
+        return len(self.arrays)
+
+    @property
+    def counted_through(self) -> datetime:
+        return self.snapshot_time - timedelta(seconds=DELTA_MARGIN_SECONDS)
+
+    @classmethod
+    def from_events(
+        cls, events: list[Dict[str, Any]], counts: Dict[str, int], snapshot_time: datetime
+    ) -> "CatalogSnapshot":
+        events = sorted(events, key=lambda ev: ev["id"])
+        arrays = CandidateArrays.from_events(events, counts)
+        start = np.array([epoch_seconds(ev.get("start_date"), -math.inf) for ev in events], dtype=np.float64)
+        end = np.array([epoch_seconds(ev.get("end_date"), math.inf) for ev in events], dtype=np.float64)
+
+        keys = [category_key(ev.get("category")) or "" for ev in events]
+        # Stable sort: rows within one category stay in id order
+        category_order = np.array(sorted(range(len(events)), key=keys.__getitem__), dtype=np.int64)
+        category_offsets: Dict[str, tuple[int, int]] = {}
+        for i, row in enumerate(category_order):
+            key = keys[row]
+            if key:
+                lo, _ = category_offsets.get(key, (i, i))
+                category_offsets[key] = (lo, i + 1)
+
+        encoded = [_encode_doc(ev) for ev in events]
+        doc_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(raw) for raw in encoded], out=doc_offsets[1:])
+        docs = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        return cls(arrays, start, end, category_order, category_offsets, doc_offsets, docs, snapshot_time)
+
+    @classmethod
+    def from_firestore(cls, firestore_service) -> "CatalogSnapshot":
+        """Scan active events and attendance counts up to now."""
+        snapshot_time = datetime.now(timezone.utc)
+        counted_through = snapshot_time - timedelta(seconds=DELTA_MARGIN_SECONDS)
+        events = firestore_service.list_events()
+        counts: Dict[str, int] = {}
+        for attendance in firestore_service.stream_attendances():
+            # Later attendances are picked up as deltas since counted_through
+            timestamp = attendance.get("timestamp")
+            if timestamp is not None and timestamp > counted_through:
+                continue
+            counts[attendance["event_id"]] = counts.get(attendance["event_id"], 0) + 1
+        # Attendances deleted since still count here: the catalog subtracts
+        # them when it reads the deletion log
+        for deletion in firestore_service.stream_attendance_deletions(since=counted_through):
+            if deletion["created_at"] <= counted_through:
+                counts[deletion["event_id"]] = counts.get(deletion["event_id"], 0) + 1
+        return cls.from_events(events, counts, snapshot_time)
+
+    def save(self, path: str) -> str:
+        """Write a new version under ``path`` and point CURRENT at it."""
+        version_dir = new_version_dir(path)
+        for column in ARRAY_COLUMNS:
+            np.save(os.path.join(version_dir, f"{column}.npy"), getattr(self.arrays, column))
+        for column in ("start", "end", "category_order", "doc_offsets", "docs"):
+            np.save(os.path.join(version_dir, f"{column}.npy"), getattr(self, column))
+        meta = {
+            "snapshot_time": _rfc3339(self.snapshot_time),
+            "categories": self.arrays.categories,
+            "amenity_bits": self.arrays.amenity_bits,
+            "category_offsets": self.category_offsets,
+        }
+        with open(os.path.join(version_dir, META_FILE), "w") as f:
+            json.dump(meta, f)
+        publish(path, version_dir)
+        return version_dir
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CatalogSnapshot"]:
+        version_dir = current_version_dir(path)
+        if version_dir is None:
+            return None
+        with open(os.path.join(version_dir, META_FILE)) as f:
+            meta = json.load(f)
+
+        def column(name: str) -> np.ndarray:
+            return np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r")
+
+        arrays = CandidateArrays(
+            *(column(name) for name in ARRAY_COLUMNS[:6]),
+            meta["categories"],
+            column("amenity_masks"),
+            meta["amenity_bits"],
+        )
+        return cls(
+            arrays,
+            column("start"),
+            column("end"),
+            column("category_order"),
+            {key: tuple(span) for key, span in meta["category_offsets"].items()},
+            column("doc_offsets"),
+            column("docs"),
+            DatetimeWithNanoseconds.from_rfc3339(meta["snapshot_time"]),
+        )
+
+    def row_of(self, event_id: str) -> Optional[int]:
+        ids = self.arrays.ids
+        key = np.bytes_(event_id.encode())
+        row = int(np.searchsorted(ids, key))
+        if row < len(ids) and ids[row] == key:
+            return row
+        return None
+
+    def doc(self, row: int) -> Dict[str, Any]:
+        lo, hi = self.doc_offsets[row], self.doc_offsets[row + 1]
+        return _decode_doc(self.docs[lo:hi].tobytes())
+
+    def select(self, category: Optional[str], lo: float, hi: float, not_before: float) -> np.ndarray:
+        """Rows in ``category`` starting at/after ``lo``, ending in [not_before, hi]."""
+        if category is not None:
+            span = self.category_offsets.get(category_key(category))
+            if span is None:
+                return np.zeros(0, dtype=np.int64)
+            rows = self.category_order[span[0]:span[1]]
+        else:
+            rows = np.arange(len(self), dtype=np.int64)
+        keep = np.ones(rows.size, dtype=bool)
+        if lo > -math.inf:
+            keep &= self.start[rows] >= lo
+        if hi < math.inf:
+            keep &= self.end[rows] <= hi
+        if not_before > -math.inf:
+            keep &= self.end[rows] >= not_before
+        return rows[keep]
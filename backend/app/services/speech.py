@@ -0,0 +1,39 @@
+from app.config import settings
+from app.services.metrics import observe_backend
+
+_speech_client = None
+
+
+def get_speech_client():
+    # google.cloud.speech is heavy to import; only speech requests pay for it
+    global _speech_client
+    if _speech_client is None:
+        from google.cloud import speech
+
+        if settings.google_application_credentials:
+            _speech_client = speech.SpeechClient.from_service_account_file(settings.google_application_credentials)
+        else:
+            _speech_client = speech.SpeechClient()
+    return _speech_client
+
+
+def transcribe_flac(flac_bytes: bytes, language_code: str = "en-US") -> str:
+    """Transcript of 16 kHz mono FLAC audio, empty if nothing was recognised."""
+    from google.cloud import speech
+
+    audio = speech.RecognitionAudio(content=flac_bytes)
+    config = speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding.FLAC,
+        sample_rate_hertz=16000,
+        language_code=language_code,
+        enable_automatic_punctuation=True,
+    )
+    client = get_speech_client()
+    with observe_backend("speech", "recognize"):
+        response = client.recognize(config=config, audio=audio)
+    transcripts = [
+        result.alternatives[0].transcript
+        for result in response.results
+        if result.alternatives
+    ]
+    return " ".join(transcripts).strip()
@@ -0,0 +1,107 @@
+from typing import Dict, Hashable
+
+# Each level has 2**SLOT_BITS slots, each spanning 2**SLOT_BITS slots of the
+# level below; LEVELS levels cover ticks up to 2**(SLOT_BITS * LEVELS)
+SLOT_BITS = 6
+LEVELS = 7
+
+_MASK = (1 << SLOT_BITS) - 1
+_MAX_TICK = (1 << (SLOT_BITS * LEVELS)) - 1
+
+
+class TimingWheel:
+    """Hierarchical timing wheel of keys due at integer ticks.
+
+    A key due ``d`` ticks ahead sits in the level whose slots are about
+    ``d`` wide, so ``schedule`` and ``cancel`` are O(1) whatever the number
+    of keys; a slot of a coarser level is redistributed to the finer ones
+    when the wheel reaches it. ``advance`` visits the ticks of non-empty
+    finest-level slots and jumps over everything else.
+    """
+
+    def __init__(self, now: int):
+        self.now = now
+        # level -> slot -> {key: due tick}
+        self._slots: list[list[Dict[Hashable, int]]] = [[{} for _ in range(1 << SLOT_BITS)] for _ in range(LEVELS)]
+        self._counts = [0] * LEVELS
+        self._where: Dict[Hashable, tuple[int, int]] = {}
+        # Keys due at or before ``now``, returned by the next advance
+        self._expired: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._where) + len(self._expired)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where or key in self._expired
+
+    def _place(self, key: Hashable, due: int) -> None:
+        if due <= self.now:
+            self._expired[key] = due
+            return
+        due = min(due, _MAX_TICK)
+        level = 0
+        # The finest level at which due and now share every coarser slot
+        while (due >> (SLOT_BITS * (level + 1))) != (self.now >> (SLOT_BITS * (level + 1))):
+            level += 1
+        slot = (due >> (SLOT_BITS * level)) & _MASK
+        self._slots[level][slot][key] = due
+        self._counts[level] += 1
+        self._where[key] = (level, slot)
+
+    def _take(self, level: int, slot: int) -> Dict[Hashable, int]:
+        entries, self._slots[level][slot] = self._slots[level][slot], {}
+        self._counts[level] -= len(entries)
+        for key in entries:
+            del self._where[key]
+        return entries
+
+    def schedule(self, key: Hashable, due: int) -> None:
+        """Schedule ``key`` at tick ``due``, replacing any earlier schedule."""
+        self.cancel(key)
+        self._place(key, due)
+
+    def cancel(self, key: Hashable) -> None:
+        where = self._where.pop(key, None)
+        if where is not None:
+            del self._slots[where[0]][where[1]][key]
+            self._counts[where[0]] -= 1
+        else:
+            self._expired.pop(key, None)
+
+    def due(self, key: Hashable) -> int:
+        where = self._where.get(key)
+        if where is None:
+            return self._expired[key]
+        return self._slots[where[0]][where[1]][key]
+
+    def advance(self, to: int) -> list[Hashable]:
+        """Move to tick ``to``; the keys due by then, in due order."""
+        fired = sorted(self._expired, key=self._expired.__getitem__)
+        self._expired = {}
+        while self.now < to:
+            lowest = next((level for level, count in enumerate(self._counts) if count), None)
+            if lowest is None:
+                self.now = to
+                break
+            if lowest > 0:
+                # Nothing is due before the next slot of the lowest busy level
+                width = SLOT_BITS * lowest
+                skip_to = (((self.now >> width) + 1) << width) - 1
+                if skip_to > self.now:
+                    self.now = min(to, skip_to)
+                    continue
+            self.now += 1
+            # Coarsest aligned level first: its keys may land in a finer
+            # slot that is redistributed at this same tick
+            level = 1
+            while level < LEVELS and not self.now & ((1 << (SLOT_BITS * level)) - 1):
+                level += 1
+            for level in range(level - 1, 0, -1):
+                for key, due in self._take(level, (self.now >> (SLOT_BITS * level)) & _MASK).items():
+                    self._place(key, due)
+            fired.extend(self._take(0, self.now & _MASK))
+            # Keys redistributed at their own due tick land in _expired
+            if self._expired:
+                fired.extend(self._expired)
+                self._expired = {}
+        return fired
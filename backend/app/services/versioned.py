@@ -0,0 +1,42 @@
+from typing import Optional
+import os
+import shutil
+import time
+
+# Pointer file naming the live version directory
+CURRENT_FILE = "CURRENT"
+
+
+def new_version_dir(path: str) -> str:
+    version_dir = os.path.join(path, f"v{time.time_ns()}")
+    os.makedirs(version_dir)
+    return version_dir
+
+
+def publish(path: str, version_dir: str, keep: int = 2) -> None:
+    """Atomically point CURRENT at ``version_dir`` and prune old versions."""
+    tmp = os.path.join(path, CURRENT_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(os.path.basename(version_dir))
+    os.replace(tmp, os.path.join(path, CURRENT_FILE))
+
+    # Readers may still have the previous version mapped; keep one back
+    versions = sorted(d for d in os.listdir(path) if d.startswith("v"))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+
+def current_version_dir(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def current_mtime(path: str) -> Optional[int]:
+    """Changes whenever a new version is published; None if there is none."""
+    try:
+        return os.stat(os.path.join(path, CURRENT_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,106 @@
+"""Cold-worker cost: in-memory catalog vs. memory-mapped snapshot.
+
+Each mode runs in a fresh interpreter and reports the time from start to
+the first ranked response plus the worker's resident memory, split into
+private (anonymous) pages and file-backed pages that every worker mapping
+the same snapshot shares. The ``scan`` mode decodes the events from a JSON
+file as a stand-in for the Firestore scan; the network time of the real
+scan comes on top of it. Run from ``backend/``::
+
+    python benchmarks/bench_catalog_snapshot.py
+"""
+from datetime import datetime, timezone
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from app.services.scoring import CandidateArrays, score_candidates, top_k  # noqa: E402
+from app.services.snapshot import CatalogSnapshot  # noqa: E402
+from benchmarks.bench_recommendations import ORIGIN, make_events  # noqa: E402
+
+N_EVENTS = 100_000
+
+
+def rss_kb():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def write_data(data_dir):
+    events, counts = make_events(N_EVENTS)
+    for i, ev in enumerate(events):
+        ev.update({
+            "name": f"Event {i}",
+            "description": "Weekly meetup at the community centre, all welcome. " * 3,
+            "start_date": f"2030-{i % 12 + 1:02d}-01T10:00:00Z",
+            "end_date": f"2030-{i % 12 + 1:02d}-01T12:00:00Z",
+            "active": True,
+            "timestamp": "2026-01-01T00:00:00Z",
+        })
+    with open(os.path.join(data_dir, "events.json"), "w") as f:
+        json.dump({"events": events, "counts": counts}, f)
+
+    snapshot_events = [
+        {**ev, **{k: datetime.fromisoformat(ev[k].replace("Z", "+00:00")) for k in ("start_date", "end_date", "timestamp")}}
+        for ev in events
+    ]
+    CatalogSnapshot.from_events(snapshot_events, counts, datetime.now(timezone.utc)).save(
+        os.path.join(data_dir, "snapshot")
+    )
+
+
+def run_mode(mode, data_dir):
+    started = time.perf_counter()
+    ranking = dict(category_counts={"Music": 2}, amenities={"coffee": 1}, origin=ORIGIN, radius_km=15.0)
+    if mode == "scan":
+        with open(os.path.join(data_dir, "events.json")) as f:
+            data = json.load(f)
+        # Pre-snapshot catalog: every event dict stays resident
+        catalog = {ev["id"]: ev for ev in data["events"]}
+        arrays = CandidateArrays.from_events(list(catalog.values()), data["counts"])
+        rows, scores = score_candidates(arrays, **ranking)
+        ranked = [catalog[arrays.event_id(row)] for row in top_k(rows, scores, 5)]
+    else:
+        snapshot = CatalogSnapshot.load(os.path.join(data_dir, "snapshot"))
+        arrays = snapshot.arrays.take(np.arange(len(snapshot)))
+        rows, scores = score_candidates(arrays, **ranking)
+        ranked = [snapshot.doc(snapshot.row_of(arrays.event_id(row))) for row in top_k(rows, scores, 5)]
+    elapsed = time.perf_counter() - started
+    assert len(ranked) == 5
+    print(json.dumps({"ms": elapsed * 1e3, **rss_kb()}))
+
+
+def main():
+    if len(sys.argv) == 3:
+        run_mode(sys.argv[1], sys.argv[2])
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_data(data_dir)
+        print(f"{N_EVENTS} events")
+        print(f"{'mode':<6} {'first response ms':>18} {'RSS MiB':>8} {'private MiB':>12} {'shared MiB':>11}")
+        for mode in ("scan", "mmap"):
+            out = subprocess.run(
+                [sys.executable, __file__, mode, data_dir], check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(out)
+            print(
+                f"{mode:<6} {result['ms']:>18.0f} {result['VmRSS'] / 1024:>8.0f} "
+                f"{result['RssAnon'] / 1024:>12.0f} {result['RssFile'] / 1024:>11.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Live updates: memory per idle subscriber and cost of one fan-out poll.
+
+10k subscribers each watch 5 of 2k events (a tenth also watch a
+category); 200 attendances are then written and one listener poll fans
+them out. Runs against benchmarks/fake_firestore.py, which counts one
+round trip per RPC. Run from ``backend/``::
+
+    python benchmarks/bench_live.py
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name in ("FIREBASE_PRIVATE_KEY", "FIREBASE_PROJECT_ID", "FIREBASE_CLIENT_EMAIL"):
+    os.environ.setdefault(name, "benchmark")
+
+import firebase_admin  # noqa: E402
+
+from benchmarks.fake_firestore import FakeClient  # noqa: E402
+from app.services import firestore as firestore_module  # noqa: E402
+
+N_EVENTS = 2_000
+N_SUBSCRIBERS = 10_000
+EVENTS_PER_SUBSCRIBER = 5
+N_WRITES = 200
+CATEGORIES = ["Social Events", "Sports", "Music", "Arts", "Education", "Health", "Outdoors", "Food"]
+
+
+async def run(client):
+    from app.services.catalog import get_catalog
+    from app.services.firestore import get_firestore
+    from app.services.live import LiveHub
+
+    rng = random.Random(5)
+    firestore = get_firestore()
+    client._clock = datetime.now(timezone.utc) - timedelta(hours=1)
+    events = firestore.create_events([
+        {
+            "name": f"Event {i}",
+            "description": "d",
+            "category": rng.choice(CATEGORIES),
+            "coordinates": {"lat": 60.17, "lng": 24.94},
+            "start_date": datetime(2030, 1, 1, tzinfo=timezone.utc),
+            "end_date": datetime(2030, 1, 1, 2, tzinfo=timezone.utc),
+            "max_attendance": 50,
+            "amenities": [],
+        }
+        for i in range(N_EVENTS)
+    ])
+    event_ids = [event["id"] for event in events]
+    get_catalog().get("warm-up")
+
+    hub = LiveHub(poll_seconds=1, min_interval=0, max_connections=N_SUBSCRIBERS, max_subscriptions=50)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subscriptions = []
+    for i in range(N_SUBSCRIBERS):
+        subscription = hub.connect()
+        categories = [rng.choice(CATEGORIES)] if i % 10 == 0 else []
+        hub.subscribe(subscription, rng.sample(event_ids, EVENTS_PER_SUBSCRIBER), categories)
+        await subscription.next_batch()  # the initial state
+        subscriptions.append(subscription)
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / N_SUBSCRIBERS
+    tracemalloc.stop()
+
+    await hub.poll()  # starts the cursors
+    client._clock = datetime.now(timezone.utc) + timedelta(minutes=1)
+    for i in range(N_WRITES):
+        firestore.create_attendance({"event_id": rng.choice(event_ids), "device_id": f"device-{i}"})
+
+    calls = client.calls
+    started = time.perf_counter()
+    await hub.poll()
+    poll_ms = (time.perf_counter() - started) * 1e3
+    rpcs = client.calls - calls
+    deltas = sum(len(s._pending) for s in subscriptions)
+    notified = sum(1 for s in subscriptions if s._pending)
+
+    print(f"{N_SUBSCRIBERS} subscribers x {EVENTS_PER_SUBSCRIBER} events: {per_subscriber / 1024:.1f} KiB each (hub side)")
+    print(f"{N_WRITES} attendance writes -> 1 poll: {rpcs} RPCs, {poll_ms:.0f} ms, "
+          f"{deltas} deltas to {notified} subscribers")
+    print(f"per-client polling of the same subscriptions: {N_SUBSCRIBERS * EVENTS_PER_SUBSCRIBER} reads per interval")
+
+
+def main():
+    client = FakeClient()
+    firebase_admin._apps.setdefault("[DEFAULT]", object())
+    firestore_module.firestore.client = lambda *args, **kwargs: client
+    asyncio.run(run(client))
+
+
+if __name__ == "__main__":
+    main()
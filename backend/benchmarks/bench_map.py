@@ -0,0 +1,90 @@
+"""Map view over 100k events: grid build time, query latency and response size.
+
+Each zoom level is queried with a 1024x768 px viewport centred on the
+events, against a per-request pass over every event (what aggregating on
+the fly would cost). Run from ``backend/``::
+
+    python benchmarks/bench_map.py
+"""
+from datetime import datetime, timezone
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import orjson  # noqa: E402
+
+from app.services.geo import extract_lat_lon  # noqa: E402
+from app.services.map_grid import LEVEL_OFFSET, MapGrid, cell_bounds  # noqa: E402
+from app.services.snapshot import CatalogSnapshot  # noqa: E402
+from benchmarks.bench_recommendations import ORIGIN  # noqa: E402
+from benchmarks.bench_search import make_text_events  # noqa: E402
+
+N_EVENTS = 100_000
+ROUNDS = 20
+ZOOMS = (4, 8, 10, 12, 14, 16)
+
+
+def viewport(zoom: int):
+    # 1024x768 px of 256 px tiles
+    width, height = 4 * 360 / 2**zoom, 3 * 180 / 2**zoom
+    return ORIGIN[0] - height / 2, ORIGIN[1] - width / 2, ORIGIN[0] + height / 2, ORIGIN[1] + width / 2
+
+
+def full_pass(events, south, west, north, east, zoom):
+    level = min(zoom + LEVEL_OFFSET, 24)
+    n_cells = 1 << level
+    cells = {}
+    for ev in events:
+        coords = extract_lat_lon(ev.get("coordinates"))
+        if coords is None or not (south <= coords[0] <= north and west <= coords[1] <= east):
+            continue
+        x = min(int((coords[1] + 180) / 360 * n_cells), n_cells - 1)
+        y = min(int((coords[0] + 90) / 180 * n_cells), n_cells - 1)
+        cell = cells.setdefault((x, y), [0, 0.0, 0.0, {}])
+        cell[0] += 1
+        cell[1] += coords[0]
+        cell[2] += coords[1]
+        cell[3][ev["category"]] = cell[3].get(ev["category"], 0) + 1
+    return [
+        {"lat": la / n, "lng": lo / n, "count": n, "categories": c, "bounds": cell_bounds(x, y, level)}
+        for (x, y), (n, la, lo, c) in cells.items()
+    ]
+
+
+def timed_ms(fn, rounds: int = ROUNDS) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e3
+
+
+def main():
+    events, counts = make_text_events(N_EVENTS)
+    snapshot = CatalogSnapshot.from_events(events, counts, datetime.now(timezone.utc))
+    started = time.perf_counter()
+    grid = MapGrid(snapshot)
+    print(f"{N_EVENTS} events, grid built in {(time.perf_counter() - started) * 1e3:.0f} ms")
+
+    shadowed = np.zeros(len(snapshot), dtype=bool)
+    # A few hundred recently changed events in the overlay
+    for ev in events[:300]:
+        grid.put(ev)
+        shadowed[snapshot.row_of(ev["id"])] = True
+
+    print(f"{'zoom':>4} {'level':>5} {'clusters':>8} {'events':>6} {'bytes':>7} {'ms':>7} {'full pass ms':>12}")
+    for zoom in ZOOMS:
+        box = viewport(zoom)
+        view = grid.view(*box, zoom, shadowed)
+        ms = timed_ms(lambda: grid.view(*box, zoom, shadowed))
+        naive = timed_ms(lambda: full_pass(events, *box, zoom), rounds=1)
+        print(
+            f"{zoom:>4} {view['level']:>5} {len(view['clusters']):>8} {len(view['events']):>6} "
+            f"{len(orjson.dumps(view, default=str)):>7} {ms:>7.2f} {naive:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Count Firestore round trips made by each mutating route.
+
+Routes run in-process against benchmarks/fake_firestore.py, which counts
+one round trip per RPC the real client would issue. The event catalog is
+warmed first, as it is on a serving worker. Each route is shown next to
+its count before writes returned the written document. Run from
+``backend/``::
+
+    python benchmarks/bench_round_trips.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name in ("FIREBASE_PRIVATE_KEY", "FIREBASE_PROJECT_ID", "FIREBASE_CLIENT_EMAIL"):
+    os.environ.setdefault(name, "benchmark")
+
+import firebase_admin  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.fake_firestore import FakeClient  # noqa: E402
+from app.services import firestore as firestore_module  # noqa: E402
+
+EVENT = {
+    "name": "Chair yoga",
+    "description": "Gentle stretching",
+    "category": "Health",
+    "coordinates": {"lat": 60.17, "lng": 24.94},
+    "start_date": "2030-05-01T10:00:00Z",
+    "end_date": "2030-05-01T11:00:00Z",
+    "max_attendance": 20,
+    "amenities": ["seating"],
+}
+PREFERENCE = {
+    "device_id": "device-1",
+    "name": "Aino",
+    "age": 78,
+    "location": {"lat": 60.17, "lng": 24.94},
+    "activities": ["walking"],
+    "topics": ["gardening"],
+    "chat_times": ["morning"],
+    "activity_type": "outdoor",
+    "looking_for": ["friends"],
+}
+
+# Round trips per route in the tree before writes returned the written
+# document: each write re-read its result and updates read before writing.
+# That tree had no conditional GETs, so a revalidation was a full read.
+BEFORE = {
+    "POST /events/register": 2,
+    "PUT /events/{id}": 3,
+    "GET /events/{id}": 1,
+    "GET /events/{id} (If-None-Match)": 1,
+    "POST /events/{id}/attendances": 5,
+    "DELETE /events/{id}/attendances/{aid}": 3,
+    "DELETE /events/{id}": 2,
+    "POST /preferences": 2,
+    "PUT /preferences/{id}": 3,
+    "GET /preferences/{id} (If-None-Match)": 1,
+    "DELETE /preferences/{id}": 2,
+}
+
+
+def main():
+    client = FakeClient()
+    firebase_admin._apps.setdefault("[DEFAULT]", object())
+    firestore_module.firestore.client = lambda *args, **kwargs: client
+
+    from app.routes import attendances, events, preferences
+    from app.services.catalog import get_catalog
+
+    app = FastAPI()
+    for module in (events, attendances, preferences):
+        app.include_router(module.router)
+    http = TestClient(app)
+
+    http.post("/events/register", json=EVENT)
+    get_catalog().get("warm-up")
+
+    def measure(label, method, url, expect=None, **kwargs):
+        before = client.calls
+        response = http.request(method, url, **kwargs)
+        ok = response.status_code == expect if expect else response.status_code < 300
+        assert ok, (label, response.status_code, response.text)
+        print(f"{label:<38} {BEFORE[label]:>6} {client.calls - before:>5}")
+        return response
+
+    print(f"{'route':<38} {'before':>6} {'after':>5}")
+    event_id = measure("POST /events/register", "POST", "/events/register", json=EVENT).json()["id"]
+    measure("PUT /events/{id}", "PUT", f"/events/{event_id}", json={"name": "Chair yoga II"})
+    etag = measure("GET /events/{id}", "GET", f"/events/{event_id}").headers["etag"]
+    measure("GET /events/{id} (If-None-Match)", "GET", f"/events/{event_id}", 304, headers={"If-None-Match": etag})
+    attendance_id = measure(
+        "POST /events/{id}/attendances", "POST", f"/events/{event_id}/attendances", json={"device_id": "device-1"}
+    ).json()["id"]
+    measure("DELETE /events/{id}/attendances/{aid}", "DELETE", f"/events/{event_id}/attendances/{attendance_id}")
+    measure("DELETE /events/{id}", "DELETE", f"/events/{event_id}")
+    preference_id = "device-1"
+    response = measure("POST /preferences", "POST", "/preferences", json=PREFERENCE)
+    preference_id = response.json().get("id", preference_id)
+    etag = measure("PUT /preferences/{id}", "PUT", f"/preferences/{preference_id}", json={"age": 79}).headers["etag"]
+    measure(
+        "GET /preferences/{id} (If-None-Match)", "GET", f"/preferences/{preference_id}", 304,
+        headers={"If-None-Match": etag},
+    )
+    measure("DELETE /preferences/{id}", "DELETE", f"/preferences/{preference_id}")
+
+
+if __name__ == "__main__":
+    main()
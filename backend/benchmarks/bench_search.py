@@ -0,0 +1,91 @@
+"""Full-text search over 100k events: index build and load time, size and query latency.
+
+Names and descriptions are drawn from a small vocabulary of English and
+Finnish words (some accented) so that terms repeat the way real ones do.
+Run from ``backend/``::
+
+    python benchmarks/bench_search.py
+"""
+from datetime import datetime, timezone
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from app.services.search import SearchIndex  # noqa: E402
+from app.services.snapshot import CatalogSnapshot  # noqa: E402
+from benchmarks.bench_recommendations import ORIGIN, make_events  # noqa: E402
+
+N_EVENTS = 100_000
+ROUNDS = 50
+WORDS = (
+    "yoga chair gentle morning walk nordic coffee choir singing bingo dance tango library reading "
+    "book club garden gardening knitting crafts painting watercolour museum tour concert piano jazz "
+    "memory cafe lunch soup sauna swimming aqua gym balance stretching chess cards bridge quiz history "
+    "photography computer smartphone help course lecture health blood pressure nutrition cooking baking "
+    "kahvila kävely lukupiiri laulu tanssi jumppa kuntosali käsityöt neulonta museo konsertti "
+    "retki luonto metsä marjastus sieni elokuva teatteri ystävä keskustelu päivä ilta café résumé"
+).split()
+QUERIES = ["yoga", "chair yoga", "kävely", "kavely", "book cl", "memory cafe", "neul", "jazz piano concert", "sa"]
+
+
+def make_text_events(n: int, seed: int = 11):
+    events, counts = make_events(n)
+    rng = random.Random(seed)
+    now = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    for i, ev in enumerate(events):
+        ev.update({
+            "name": " ".join(rng.choices(WORDS, k=rng.randint(2, 5))).capitalize(),
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(15, 60))),
+            "start_date": now,
+            "end_date": now,
+            "active": True,
+            "timestamp": now,
+        })
+    return events, counts
+
+
+def main():
+    events, counts = make_text_events(N_EVENTS)
+    snapshot = CatalogSnapshot.from_events(events, counts, datetime.now(timezone.utc))
+
+    started = time.perf_counter()
+    built = SearchIndex.build(snapshot)
+    build_s = time.perf_counter() - started
+    with tempfile.TemporaryDirectory() as path:
+        built.save(path)
+        started = time.perf_counter()
+        index = SearchIndex.load(path, snapshot)
+        load_ms = (time.perf_counter() - started) * 1e3
+        size = sum(getattr(index, column).nbytes for column in ("offsets", "rows", "tf", "doc_len"))
+        print(f"{N_EVENTS} events, {len(index.terms)} terms, {len(index.rows)} postings ({size / 2**20:.1f} MiB)")
+        print(f"build in-process {build_s:.2f} s, load published {load_ms:.1f} ms")
+        run_queries(index, events, snapshot)
+
+
+def run_queries(index, events, snapshot):
+    shadowed = np.zeros(len(snapshot), dtype=bool)
+    # A few hundred recently changed events in the overlay
+    for ev in events[:300]:
+        index.put({**ev, "name": ev["name"] + " updated"})
+        shadowed[snapshot.row_of(ev["id"])] = True
+
+    print(f"{'query':<22} {'hits':>5} {'ms':>7} {'ms (15 km)':>11}")
+    for query in QUERIES:
+        results = index.search(query, 20, shadowed)
+        timings = []
+        for origin, radius in ((None, None), (ORIGIN, 15.0)):
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                index.search(query, 20, shadowed, origin, radius)
+            timings.append((time.perf_counter() - started) / ROUNDS * 1e3)
+        print(f"{query:<22} {len(results):>5} {timings[0]:>7.2f} {timings[1]:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
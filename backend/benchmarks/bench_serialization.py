@@ -0,0 +1,110 @@
+"""Micro-benchmark: response serialization cost per 1k events.
+
+Compares building ``Event`` models and letting FastAPI revalidate them
+through ``response_model`` against rendering the stored documents with
+``app.services.serialization.render``. Each variant is timed on its own
+and through a FastAPI route (in-process, no network).
+
+Run from ``backend/``::
+
+    python benchmarks/bench_serialization.py
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name in ("FIREBASE_PRIVATE_KEY", "FIREBASE_PROJECT_ID", "FIREBASE_CLIENT_EMAIL"):
+    os.environ.setdefault(name, "benchmark")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.models.event import Event  # noqa: E402
+from app.services.serialization import render  # noqa: E402
+
+CATEGORIES = ["Social Events", "Sports", "Music", "Arts", "Education", "Health", "Outdoors", "Food"]
+AMENITIES = ["wheelchair", "parking", "toilets", "seating", "coffee", "wifi", "elevator", "guide", "shade", "water"]
+BATCH = 1000
+ROUNDS = 20
+
+
+def _firestore_time(value: datetime) -> DatetimeWithNanoseconds:
+    return DatetimeWithNanoseconds(*value.timetuple()[:6], nanosecond=value.microsecond * 1000, tzinfo=timezone.utc)
+
+
+def make_events(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    now = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    events = []
+    for i in range(n):
+        start = now + timedelta(hours=rng.randint(0, 24 * 60))
+        written = _firestore_time(now - timedelta(seconds=rng.randint(0, 10**6), microseconds=rng.randint(0, 10**6)))
+        events.append({
+            "id": f"evt_{i:012d}",
+            "name": f"Event {i}",
+            "description": "A friendly afternoon get-together with coffee and a short walk. " * 3,
+            "category": rng.choice(CATEGORIES),
+            "coordinates": {"lat": 60.17 + rng.uniform(-0.5, 0.5), "lng": 24.94 + rng.uniform(-1, 1)},
+            "start_date": start,
+            "end_date": start + timedelta(hours=2),
+            "max_attendance": rng.randint(5, 200),
+            "amenities": rng.sample(AMENITIES, rng.randint(0, 4)),
+            "active": True,
+            "timestamp": written,
+            "updated_at": written,
+        })
+    return events
+
+
+def per_batch_ms(fn) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - started) / ROUNDS * 1e3
+
+
+def main():
+    events = make_events(BATCH)
+    adapter = TypeAdapter(list[Event])
+
+    def models_and_response_model():
+        # What a route returning [Event(**e)] with response_model=list[Event] does
+        models = [Event(**e) for e in events]
+        return adapter.dump_json(adapter.validate_python(models, from_attributes=True))
+
+    def rendered():
+        return render(Event, events).body
+
+    assert adapter.validate_json(models_and_response_model()) == adapter.validate_json(rendered())
+
+    app = FastAPI()
+
+    @app.get("/models", response_model=list[Event])
+    async def as_models():
+        return [Event(**e) for e in events]
+
+    @app.get("/render", response_model=list[Event])
+    async def as_render():
+        return render(Event, events)
+
+    http = TestClient(app)
+
+    print(f"serialization per {BATCH} events (ms)")
+    print(f"{'':<28} {'direct':>8} {'route':>8}")
+    for label, fn, path in (
+        ("Event(**e) + response_model", models_and_response_model, "/models"),
+        ("render()", rendered, "/render"),
+    ):
+        direct = per_batch_ms(fn)
+        route = per_batch_ms(lambda: http.get(path).content)
+        print(f"{label:<28} {direct:>8.2f} {route:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
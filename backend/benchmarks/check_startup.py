@@ -0,0 +1,87 @@
+"""Import-time and cold-start budget for ``app.main``.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter.
+It fails if the cumulative import time of ``app.main`` exceeds the budget,
+or if an SDK that should only load on first use is imported at startup.
+It then starts the app (lifespan included, against
+benchmarks/fake_firestore.py) in another fresh interpreter and times the
+span from interpreter start to the first ``/health`` response. Run from
+``backend/``::
+
+    python benchmarks/check_startup.py [--import-budget-ms 1500] [--cold-start-budget-ms 3000]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the routes that use these may import them, on first request
+LAZY_MODULES = ("google.cloud.speech", "openai", "pytesseract", "PIL")
+
+COLD_START = """
+import firebase_admin
+from benchmarks.fake_firestore import FakeClient
+from firebase_admin import firestore
+firebase_admin._apps.setdefault("[DEFAULT]", object())
+firestore.client = lambda *args, **kwargs: FakeClient()
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app) as http:
+    assert http.get("/health").status_code == 200
+"""
+
+
+def run(args):
+    env = dict(os.environ)
+    for name in ("FIREBASE_PRIVATE_KEY", "FIREBASE_PROJECT_ID", "FIREBASE_CLIENT_EMAIL"):
+        env.setdefault(name, "startup-check")
+    return subprocess.run([sys.executable, *args], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def import_times():
+    """Cumulative import time in microseconds per module."""
+    stderr = run(["-X", "importtime", "-c", "import app.main"]).stderr
+    times = {}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            times[match.group(3)] = int(match.group(1))
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--cold-start-budget-ms", type=float, default=3000)
+    args = parser.parse_args(argv)
+
+    failures = []
+    times = import_times()
+    import_ms = times["app.main"] / 1e3
+    print(f"import app.main      {import_ms:>8.0f} ms (budget {args.import_budget_ms:.0f})")
+    if import_ms > args.import_budget_ms:
+        failures.append("import time over budget")
+    for name, us in sorted(times.items(), key=lambda item: -item[1])[1:6]:
+        print(f"  {name:<30} {us / 1e3:>8.0f} ms")
+    eager = [name for name in times if any(name == m or name.startswith(m + ".") for m in LAZY_MODULES)]
+    if eager:
+        failures.append(f"imported at startup: {', '.join(sorted(eager)[:5])}")
+
+    started = time.perf_counter()
+    run(["-c", COLD_START])
+    cold_ms = (time.perf_counter() - started) * 1e3
+    print(f"cold start to /health {cold_ms:>7.0f} ms (budget {args.cold_start_budget_ms:.0f})")
+    if cold_ms > args.cold_start_budget_ms:
+        failures.append("cold start over budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Minimal in-memory stand-in for the Firestore client used by benchmarks.
+
+Covers only what FirestoreService calls. Every RPC the real client would
+make (document get/set/update/delete/create, query stream, count
+aggregation, batch commit, get_all) increments ``FakeClient.calls`` so benchmarks can report round
+trips without a network or emulator.
+"""
+import copy
+import operator
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud.firestore_v1.transforms import SERVER_TIMESTAMP
+
+_OPS = {
+    "==": operator.eq,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, options: value in options,
+}
+
+
+class _WriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class _Snapshot:
+    def __init__(self, reference, data, update_time):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field):
+        return self._data.get(field)
+
+
+class _Option:
+    def __init__(self, last_update_time=None, exists=None):
+        self.last_update_time = last_update_time
+        self.exists = exists
+
+
+class _Document:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self._collection = collection
+        self.id = doc_id
+
+    @property
+    def _docs(self):
+        return self._client.data.setdefault(self._collection, {})
+
+    def _check(self, option):
+        current = self._docs.get(self.id)
+        if option is None:
+            return
+        if option.exists is not None and (current is not None) != option.exists:
+            raise NotFound(self.id) if option.exists else AlreadyExists(self.id)
+        if option.last_update_time is not None and (current is None or current[1] != option.last_update_time):
+            raise FailedPrecondition(self.id)
+
+    def _write(self, data):
+        now = self._client.tick()
+        resolved = {k: (now if v is SERVER_TIMESTAMP else v) for k, v in data.items()}
+        return resolved, now
+
+    def get(self):
+        self._client.calls += 1
+        data, update_time = self._docs.get(self.id, (None, None))
+        return _Snapshot(self, copy.deepcopy(data), update_time)
+
+    def set(self, data, merge=False):
+        self._client.calls += 1
+        resolved, now = self._write(data)
+        if merge and self.id in self._docs:
+            resolved = {**self._docs[self.id][0], **resolved}
+        self._docs[self.id] = (copy.deepcopy(resolved), now)
+        return _WriteResult(now)
+
+    def create(self, data):
+        self._client.calls += 1
+        if self.id in self._docs:
+            raise AlreadyExists(self.id)
+        resolved, now = self._write(data)
+        self._docs[self.id] = (copy.deepcopy(resolved), now)
+        return _WriteResult(now)
+
+    def update(self, data, option=None):
+        self._client.calls += 1
+        if self.id not in self._docs:
+            raise NotFound(self.id)
+        self._check(option)
+        resolved, now = self._write(data)
+        self._docs[self.id] = ({**self._docs[self.id][0], **copy.deepcopy(resolved)}, now)
+        return _WriteResult(now)
+
+    def delete(self, option=None):
+        self._client.calls += 1
+        self._check(option)
+        self._docs.pop(self.id, None)
+        return _WriteResult(self._client.tick())
+
+
+class _Query:
+    def __init__(self, client, collection, filters=(), orders=(), cursor=None, limit=None, fields=None):
+        self._client = client
+        self._collection = collection
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._cursor = cursor
+        self._limit = limit
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = dict(
+            filters=self._filters, orders=self._orders, cursor=self._cursor,
+            limit=self._limit, fields=self._fields,
+        )
+        state.update(changes)
+        return _Query(self._client, self._collection, **state)
+
+    def document(self, doc_id=None):
+        return _Document(self._client, self._collection, doc_id or uuid.uuid4().hex[:20])
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + [(field, direction == "DESCENDING")])
+
+    def start_after(self, values):
+        return self._copy(cursor=values)
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def _matches(self):
+        rows = []
+        for doc_id, (data, update_time) in self._client.data.get(self._collection, {}).items():
+            if all(f in data and _OPS[op](data[f], v) for f, op, v in self._filters):
+                rows.append((doc_id, data, update_time))
+
+        def key(field):
+            return (lambda row: row[0]) if field == "__name__" else (lambda row: row[1].get(field))
+
+        for field, descending in reversed(self._orders):
+            rows.sort(key=key(field), reverse=descending)
+        if self._cursor is not None and self._orders:
+            # Cursor values cover the order_by fields; all ascending here
+            fields = [field for field, _ in self._orders]
+            bound = tuple(self._cursor[field] for field in fields)
+            rows = [row for row in rows if tuple(key(field)(row) for field in fields) > bound]
+        return rows[:self._limit] if self._limit is not None else rows
+
+    def count(self, alias=None):
+        return _CountQuery(self, alias)
+
+    def stream(self):
+        self._client.calls += 1
+        for doc_id, data, update_time in self._matches():
+            if self._fields is not None:
+                data = {f: data[f] for f in self._fields if f in data}
+            yield _Snapshot(_Document(self._client, self._collection, doc_id), copy.deepcopy(data), update_time)
+
+
+class _AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class _CountQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self):
+        self._query._client.calls += 1
+        return [[_AggregationResult(self._alias, len(self._query._matches()))]]
+
+
+class _Batch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, data, merge=False):
+        self._ops.append(lambda: reference.set(data, merge=merge))
+
+    def create(self, reference, data):
+        self._ops.append(lambda: reference.create(data))
+
+    def update(self, reference, data):
+        self._ops.append(lambda: reference.update(data))
+
+    def delete(self, reference):
+        self._ops.append(lambda: reference.delete())
+
+    def commit(self):
+        calls = self._client.calls
+        results = [op() for op in self._ops]
+        self._client.calls = calls + 1
+        return results
+
+
+class FakeClient:
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+        self._clock = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def tick(self):
+        self._clock += timedelta(microseconds=1)
+        return self._clock
+
+    def collection(self, name):
+        return _Query(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+    def get_all(self, references):
+        calls = self.calls
+        snapshots = [reference.get() for reference in references]
+        self.calls = calls + 1
+        return snapshots
+
+    def write_option(self, **kwargs):
+        return _Option(**kwargs)
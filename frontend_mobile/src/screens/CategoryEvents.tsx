@@ -50,8 +50,11 @@ const CategoryEvents: React.FC<CategoryEventsProps> = ({
         // const deviceId = await getDeviceId();
         console.log("📱 REAL DEVICE ID:", deviceId);
 
+        const categoryParam = categoryName
+          ? `&category=${encodeURIComponent(categoryName)}`
+          : "";
         const response = await fetch(
-          `${API_BASE}/recommendations/?device_id=${deviceId}&limit=20`
+          `${API_BASE}/recommendations/?device_id=${deviceId}&limit=20${categoryParam}`
         );
 
         const data = await response.json();
@@ -65,14 +68,7 @@ const CategoryEvents: React.FC<CategoryEventsProps> = ({
           return;
         }
 
-        const filtered = data.filter(
-          (ev: any) =>
-            ev.category?.toLowerCase() === categoryName?.toLowerCase()
-        );
-
-        console.log("🎯 Filtered events:", filtered);
-
-        setEvents(filtered);
+        setEvents(data);
       } catch (error) {
         console.log("Error loading events:", error);
       }